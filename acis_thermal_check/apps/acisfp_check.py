@@ -11,17 +11,20 @@ validation plots comparing predicted values to telemetry for the
 previous three weeks.
 """
 
+import copy
 import sys
+from collections import defaultdict
 
 import matplotlib
 import numpy as np
 from astropy.table import Table
 from chandra_limits import ACISFPLimit
 from cxotime import CxoTime
+from matplotlib.collections import LineCollection
 from ska_matplotlib import cxctime2plotdate
 
 from acis_thermal_check import ACISThermalCheck, get_options, mylog
-from acis_thermal_check.utils import PredictPlot, paint_perigee
+from acis_thermal_check.utils import PredictPlot, paint_perigee, save_figures
 
 # Matplotlib setup
 # Use Agg backend for command-line (non-interactive) operation
@@ -46,7 +49,7 @@ class ACISFPCheck(ACISThermalCheck):
         # list contains all ACIS and all ECS observations.
         self.acis_and_ecs_obs = []
 
-    def _calc_model_supp(self, model, state_times, states, ephem, state0):
+    def _calc_model_supp(self, model, sampler, states, ephem, state0):
         """
         Create and run the Thermal Model for the Focal Plane temperature.
 
@@ -82,7 +85,7 @@ class ACISFPCheck(ACISThermalCheck):
         for i in range(1, 5):
             name = f"aoattqt{i}"
             state_name = f"q{i}"
-            model.comp[name].set_data(states[state_name], state_times)
+            sampler.set_data(model.comp[name], states[state_name])
 
         # Input ephemeris explicitly for calculating Earth heating
         for axis in "xyz":
@@ -102,7 +105,7 @@ class ACISFPCheck(ACISThermalCheck):
             # Set the HRC 15 volt state
             # NOTE: Because of an error in AP, the correct state is 215PCAST=OFF,
             # which indicates that the HRC 15V is ON.
-            model.comp["215pcast_off"].set_data(states["hrc_15v"] == "ON", state_times)
+            sampler.set_data(model.comp["215pcast_off"], states["hrc_15v"] == "ON")
 
     def make_prediction_plots(
         self, outdir, states, temps, load_start, upper_limit, lower_limit
@@ -144,54 +147,120 @@ class ACISFPCheck(ACISThermalCheck):
         plot_start = max(load_start - 2.0, cxctime2plotdate([times[0]])[0])
 
         w1 = None
-        # Make plots of FPTEMP and pitch vs time, looping over
-        # three different temperature ranges
+        # Make plots of FPTEMP and pitch vs time for three different
+        # temperature ranges. The plots only differ in their y-limits
+        # and in the positions of the obsid bars and labels, so they
+        # are made from one figure, which is written out for each of
+        # the ranges in turn.
         ylim = [(-120, -79), (-120, -119), (-120.0, -103.5)]
         ypos = [-110.0, -119.35, -116]
         capwidth = [2.0, 0.1, 0.4]
         textypos = [-108.0, -119.3, -115.7]
         fontsize = [12, 9, 9]
+        plot = PredictPlot(
+            x=times,
+            y=temps[self.name],
+            x2=self.predict_model.times,
+            y2=self.predict_model.comp["pitch"].mvals,
+            xlabel="Date",
+            ylabel=r"Temperature ($^\circ$C)",
+            ylabel2="Pitch (deg)",
+            xmin=plot_start,
+            ylim=ylim[0],
+            ylim2=(40, 180),
+            figsize=(12, 7.142857142857142),
+            width=w1,
+            load_start=load_start,
+        )
+        self._plot_ensemble(plot)
+        plot.ax.set_title(self.msid.upper(), loc="left", pad=10)
+        # Draw the planning limit line on the plot (broken up
+        # according to condition)
+        upper_limit.plot(
+            fig_ax=(plot.fig, plot.ax),
+            lw=3,
+            zorder=2,
+            use_colors=True,
+            show_changes=False,
+        )
+        # Draw the yellow limit line on the plot
+        plot.add_limit_line(self.limits["yellow_hi"], lw=3)
+        # Get the width of this plot to make the widths of all the
+        # prediction plots the same
+        w1, _ = plot.fig.get_size_inches()
+
+        # These next lines are dummies so we can get the obsids in the legend
+        plot.ax.errorbar(
+            [0.0, 0.0],
+            [1.0, 1.0],
+            xerr=1.0,
+            lw=2,
+            xlolims=True,
+            color="blue",
+            capsize=4,
+            capthick=2,
+            label="Cold ECS",
+        )
+        plot.ax.errorbar(
+            [0.0, 0.0],
+            [1.0, 1.0],
+            xerr=1.0,
+            lw=2,
+            xlolims=True,
+            color="red",
+            capsize=4,
+            capthick=2,
+            label="ACIS-I",
+        )
+        plot.ax.errorbar(
+            [0.0, 0.0],
+            [1.0, 1.0],
+            xerr=1.0,
+            lw=2,
+            xlolims=True,
+            color="green",
+            capsize=4,
+            capthick=2,
+            label="ACIS-S",
+        )
+
+        # Make the legend on the temperature plot
+        plot.ax.legend(
+            bbox_to_anchor=(0.15, 0.99),
+            loc="lower left",
+            ncol=4,
+            fontsize=12,
+        )
+
+        # Each of the ranges has its own entry, which shares the figure
         for i in range(3):
             name = f"{self.name}_{i + 1}"
-            plots[name] = PredictPlot(
-                fig_id=i + 1,
-                x=times,
-                y=temps[self.name],
-                x2=self.predict_model.times,
-                y2=self.predict_model.comp["pitch"].mvals,
-                xlabel="Date",
-                ylabel=r"Temperature ($^\circ$C)",
-                ylabel2="Pitch (deg)",
-                xmin=plot_start,
-                ylim=ylim[i],
-                ylim2=(40, 180),
-                figsize=(12, 7.142857142857142),
-                width=w1,
-                load_start=load_start,
-            )
-            plots[name].ax.set_title(self.msid.upper(), loc="left", pad=10)
-            # Draw the planning limit line on the plot (broken up
-            # according to condition)
-            upper_limit.plot(
-                fig_ax=(plots[name].fig, plots[name].ax),
-                lw=3,
-                zorder=2,
-                use_colors=True,
-                show_changes=False,
+            plots[name] = copy.copy(plot)
+            # Build the file name
+            plots[
+                name
+            ].filename = (
+                f"{self.msid.lower()}M{-int(ylim[i][0])}toM{-int(ylim[i][1])}.png"
             )
-            # Draw the yellow limit line on the plot
-            plots[name].add_limit_line(self.limits["yellow_hi"], lw=3)
-            # Get the width of this plot to make the widths of all the
-            # prediction plots the same
-            if i == 0:
-                w1, _ = plots[name].fig.get_size_inches()
 
+        self._make_state_plots(plots, w1, plot_start, states, load_start)
+
+        # Now plot any perigee passages that occur between xmin and xmax
+        # for eachpassage in perigee_passages:
+        paint_perigee(self.perigee_passages, plots)
+
+        plots["default"] = plots[f"{self.name}_3"]
+
+        # Write the temperature plot for each of the ranges, with the
+        # obsid bars and labels for that range. Those of the last range
+        # are kept, so that the figure is left as the default plot.
+        for i in range(3):
+            plot.ax.set_ylim(*ylim[i])
             # Now draw horizontal lines on the plot running from start to stop
             # and label them with the Obsid
-            draw_obsids(
+            artists = draw_obsids(
                 self.acis_and_ecs_obs,
-                plots,
-                name,
+                plot.ax,
                 ypos[i],
                 ypos[i] - 0.5 * capwidth[i],
                 ypos[i] + 0.5 * capwidth[i],
@@ -199,71 +268,23 @@ class ACISFPCheck(ACISThermalCheck):
                 fontsize[i],
                 plot_start,
             )
-
-            # These next lines are dummies so we can get the obsids in the legend
-            plots[name].ax.errorbar(
-                [0.0, 0.0],
-                [1.0, 1.0],
-                xerr=1.0,
-                lw=2,
-                xlolims=True,
-                color="blue",
-                capsize=4,
-                capthick=2,
-                label="Cold ECS",
-            )
-            plots[name].ax.errorbar(
-                [0.0, 0.0],
-                [1.0, 1.0],
-                xerr=1.0,
-                lw=2,
-                xlolims=True,
-                color="red",
-                capsize=4,
-                capthick=2,
-                label="ACIS-I",
-            )
-            plots[name].ax.errorbar(
-                [0.0, 0.0],
-                [1.0, 1.0],
-                xerr=1.0,
-                lw=2,
-                xlolims=True,
-                color="green",
-                capsize=4,
-                capthick=2,
-                label="ACIS-S",
-            )
-
-            # Make the legend on the temperature plot
-            plots[name].ax.legend(
-                bbox_to_anchor=(0.15, 0.99),
-                loc="lower left",
-                ncol=4,
-                fontsize=12,
-            )
-
-            # Build the file name
-            filename = (
-                f"{self.msid.lower()}M{-int(ylim[i][0])}toM{-int(ylim[i][1])}.png"
-            )
-            plots[name].filename = filename
-
-        self._make_state_plots(plots, 3, w1, plot_start, states, load_start)
-
-        # Now plot any perigee passages that occur between xmin and xmax
-        # for eachpassage in perigee_passages:
-        paint_perigee(self.perigee_passages, plots)
-
-        plots["default"] = plots[f"{self.name}_3"]
-
-        # Now write all the plots after possible
+            outfile = outdir / plots[f"{self.name}_{i + 1}"].filename
+            mylog.info("Writing plot file %s", outfile)
+            plot.fig.savefig(outfile)
+            if i < 2:
+                for artist in artists:
+                    artist.remove()
+
+        # Now write the rest of the plots after possible
         # customizations have been made
-        for key, plot in plots.items():
-            if key != self.msid:
-                outfile = outdir / plot.filename
-                mylog.info("Writing plot file %s", outfile)
-                plot.fig.savefig(outfile)
+        save_figures(
+            [
+                (other.fig, outdir / other.filename)
+                for key, other in plots.items()
+                if key != self.msid and other.fig is not plot.fig
+            ],
+            workers=self.plot_workers,
+        )
 
         return plots
 
@@ -341,8 +362,7 @@ class ACISFPCheck(ACISThermalCheck):
 
 def draw_obsids(
     obs_list,
-    plots,
-    msid,
+    ax,
     ypos,
     endcapstart,
     endcapstop,
@@ -360,15 +380,20 @@ def draw_obsids(
 
     The caller supplies:
         Options from the Command line supplied by the user at runtime
-        The plot dictionary
-        The MSID used to index into the plot dictionary (superfluous but required)
+        The axes to draw on
         The position on the Y axis you'd like these indicators to appear
         The Y position of the bottom of the end caps
         The Y position of the top of the end caps
         The starting position of the OBSID number text
         The font size
         The left time of the plot in plot_date units
+
+    The artists which are drawn are returned, so that they can be removed.
     """
+    # The lines for the observations of each color are drawn as a
+    # single collection
+    segments = defaultdict(list)
+    artists = []
     # Now run through the observation list
     for eachobservation in obs_list:
         # extract the obsid
@@ -401,34 +426,12 @@ def draw_obsids(
 
         if in_fp.startswith("ACIS-") or obsid > 60000:
             # For each ACIS Obsid, draw a horizontal line to show
-            # its start and stop
-            plots[msid].ax.hlines(
-                ypos,
-                obs_start,
-                obs_stop,
-                linestyle="-",
-                color=color,
-                zorder=2,
-                linewidth=2.0,
-            )
-
-            # Plot vertical end caps for each obsid to visually show start/stop
-            plots[msid].ax.vlines(
-                obs_start,
-                endcapstart,
-                endcapstop,
-                color=color,
-                zorder=2,
-                linewidth=2.0,
-            )
-            plots[msid].ax.vlines(
-                obs_stop,
-                endcapstart,
-                endcapstop,
-                color=color,
-                zorder=2,
-                linewidth=2.0,
-            )
+            # its start and stop, with vertical end caps
+            segments[color] += [
+                [(obs_start, ypos), (obs_stop, ypos)],
+                [(obs_start, endcapstart), (obs_start, endcapstop)],
+                [(obs_stop, endcapstart), (obs_stop, endcapstop)],
+            ]
 
             # Now print the obsid in the middle of the time span,
             # above the line, and rotate 90 degrees.
@@ -436,7 +439,7 @@ def draw_obsids(
             obs_time = obs_start + (obs_stop - obs_start) / 2
             if obs_time > plot_start:
                 # Now plot the obsid.
-                plots[msid].ax.text(
+                text = ax.text(
                     obs_time,
                     textypos,
                     obsid_txt,
@@ -447,13 +450,26 @@ def draw_obsids(
                     zorder=2,
                     fontsize=fontsize,
                 )
+                artists.append(text)
+
+    for color, color_segments in segments.items():
+        lines = LineCollection(
+            color_segments,
+            linestyle="-",
+            color=color,
+            zorder=2,
+            linewidth=2.0,
+        )
+        artists.append(ax.add_collection(lines, autolim=False))
+
+    return artists
 
 
 def main():
     args = get_options()
     acisfp_check = ACISFPCheck()
     try:
-        acisfp_check.run(args)
+        sys.exit(acisfp_check.run(args))
     except Exception as msg:
         if args.traceback:
             raise
@@ -36,7 +36,7 @@ def main():
     args = get_options()
     bep_pcb_check = BEPPCBCheck()
     try:
-        bep_pcb_check.run(args)
+        sys.exit(bep_pcb_check.run(args))
     except Exception as msg:
         if args.traceback:
             raise
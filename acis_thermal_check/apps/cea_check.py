@@ -41,7 +41,7 @@ class CEACheck(ACISThermalCheck):
             other_map={"1dahtbon": "dh_heater"},
         )
 
-    def _calc_model_supp(self, model, state_times, states, ephem, state0):
+    def _calc_model_supp(self, model, sampler, states, ephem, state0):
         """
         Update to initialize the cea0 pseudo-node. If 2ceahvpt
         has an initial value (T_cea) - which it does at
@@ -57,16 +57,15 @@ class CEACheck(ACISThermalCheck):
             model.comp[node].set_data(T_cea, model.times)
         model.comp["2ps5aon_on"].set_data(True)
         model.comp["2ps5bon_on"].set_data(False)
-        model.comp["2imonst_on"].set_data(states["hrc_i"] == "ON", state_times)
-        model.comp["2sponst_on"].set_data(states["hrc_s"] == "ON", state_times)
-        model.comp["2s2onst_on"].set_data(states["hrc_15v"] == "ON", state_times)
-        model.comp["224pcast_off"].set_data(states["hrc_24v"] == "ON", state_times)
-        model.comp["215pcast_off"].set_data(states["hrc_15v"] == "ON", state_times)
+        sampler.set_data(model.comp["2imonst_on"], states["hrc_i"] == "ON")
+        sampler.set_data(model.comp["2sponst_on"], states["hrc_s"] == "ON")
+        sampler.set_data(model.comp["2s2onst_on"], states["hrc_15v"] == "ON")
+        sampler.set_data(model.comp["224pcast_off"], states["hrc_24v"] == "ON")
+        sampler.set_data(model.comp["215pcast_off"], states["hrc_15v"] == "ON")
 
-    def _make_state_plots(self, plots, num_figs, w1, plot_start, states, load_start):
+    def _make_state_plots(self, plots, w1, plot_start, states, load_start):
         # Make a plot of ACIS HRC states
         plots["hrc"] = PredictPlot(
-            fig_id=num_figs + 1,
             title="HRC States",
             xlabel="Date",
             x=pointpair(states["tstart"], states["tstop"]),
@@ -86,15 +85,14 @@ class CEACheck(ACISThermalCheck):
         plots["hrc"].ax.legend(fancybox=True, framealpha=0.5, loc=2)
         plots["hrc"].filename = "hrc.png"
 
-        num_figs += 1
-        super()._make_state_plots(plots, num_figs, w1, plot_start, states, load_start)
+        super()._make_state_plots(plots, w1, plot_start, states, load_start)
 
 
 def main():
     args = get_options(use_acis_opts=False)
     cea_check = CEACheck()
     try:
-        cea_check.run(args)
+        sys.exit(cea_check.run(args))
     except Exception as msg:
         if args.traceback:
             raise
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+
+"""
+========================
+compare_loads
+========================
+
+This code compares the thermal model predictions for several candidate
+loads for the same week. The model specifications, telemetry, and
+ephemeris are obtained once and shared between all of the candidates,
+and the predictions for each candidate are run in a separate process,
+all at the same time. The outputs of each model for each candidate are
+written to ``<outdir>/<candidate>/<model>``, and a table comparing the
+peak temperatures and violations of the candidates is written to
+``<outdir>/comparison.csv``.
+"""
+
+import copy
+import os
+import sys
+from pathlib import Path
+
+import matplotlib
+import numpy as np
+from astropy.table import Table
+from cxotime import CxoTime
+
+from acis_thermal_check import get_options, mylog
+from acis_thermal_check.apps.run_all_checks import check_classes
+from acis_thermal_check.inputs import SharedInputs, run_checks
+from acis_thermal_check.main import version
+from acis_thermal_check.utils import ForkedTask
+
+# Matplotlib setup
+# Use Agg backend for command-line (non-interactive) operation
+matplotlib.use("Agg")
+
+
+def candidate_labels(backstop_files):
+    """
+    Make a unique label for each candidate load from the name of its
+    backstop file or directory.
+
+    Parameters
+    ----------
+    backstop_files : list of strings
+        The paths to the backstop files or directories of the candidates.
+    """
+    labels = []
+    for backstop_file in backstop_files:
+        path = Path(backstop_file)
+        label = path.stem if path.suffix == ".backstop" else path.name
+        if label in labels:
+            label = f"{label}_{len(labels) + 1}"
+        labels.append(label)
+    return labels
+
+
+def summarize_check(check):
+    """
+    Summarize the prediction of a model for a candidate load.
+
+    Parameters
+    ----------
+    check : ACISThermalCheck object
+        The model, which has been run.
+    """
+    model = check.predict_model
+    after = model.times >= check.state_builder.tstart
+    temps = model.comp[check.msid].mvals[after]
+    viols = [viol for key in check.predict_viols for viol in check.predict_viols[key]]
+    return {
+        "max_temp": temps.max(),
+        "min_temp": temps.min(),
+        "num_viols": len(viols),
+        "duration": sum(viol["duration"] for viol in viols),
+        "first_viol": min((viol["datestart"] for viol in viols), default="N/A"),
+    }
+
+
+def run_candidate(checks, args, load_inputs):
+    """
+    Run the predictions of all of the models for a candidate load,
+    and summarize them.
+
+    Parameters
+    ----------
+    checks : list of ACISThermalCheck objects
+        The models to run.
+    args : ArgumentParser arguments
+        The command-line options object for the candidate.
+    load_inputs : :class:`~acis_thermal_check.inputs.SharedInputs`
+        The inputs shared with the other models and candidates.
+    """
+    failed = run_checks(checks, args, shared_inputs=load_inputs)
+    summaries = {}
+    for check in checks:
+        if check.name in failed:
+            summaries[check.name] = None
+        else:
+            summaries[check.name] = summarize_check(check)
+    return summaries
+
+
+def main():
+    opts = [
+        (
+            "backstop-files",
+            {
+                "nargs": "+",
+                "required": True,
+                "help": "Paths to the backstop files of the candidate loads. If a "
+                "path is a directory, the backstop file will be searched for "
+                "within it.",
+            },
+        ),
+        (
+            "models",
+            {
+                "nargs": "+",
+                "choices": list(check_classes),
+                "default": list(check_classes),
+                "help": "The models to run. Default: all of them",
+            },
+        ),
+    ]
+    args = get_options(opts=opts)
+    if args.version:
+        print(f"acis_thermal_check version {version}")
+        return
+    if args.model_spec is not None or args.T_init is not None:
+        raise RuntimeError(
+            "--model-spec and --T-init cannot be used when comparing loads!"
+        )
+
+    # Only the predictions are compared
+    args.pred_only = True
+    args.backstop_file = None
+
+    checks = [check_classes[name]() for name in args.models]
+    shared_inputs = SharedInputs(checks, args)
+
+    # Read the backstop file of each candidate in this process, so that
+    # the load start and stop times are known and the state builders are
+    # handed to the processes for the candidates
+    labels = candidate_labels(args.backstop_files)
+    candidates = []
+    state_builders = []
+    for label, backstop_file in zip(labels, args.backstop_files, strict=True):
+        load_args = copy.copy(args)
+        load_args.backstop_file = backstop_file
+        load_args.outdir = args.outdir / label
+        load_inputs = shared_inputs.for_load(load_args)
+        state_builders.extend(
+            load_inputs.get_state_builder(name)
+            for name in {shared_inputs.state_builder_name(check) for check in checks}
+        )
+        candidates.append((label, load_args, load_inputs))
+
+    # Fetch the telemetry and the ephemeris shared by all of the
+    # candidates before the candidates are run
+    t_run_start = CxoTime(shared_inputs.run_start).secs
+    tstart = min([t_run_start] + [sb.tstart for sb in state_builders])
+    tstop = max(sb.tstop for sb in state_builders)
+    telem_start = min(
+        shared_inputs.get_msidset(check, tstart, args.days).times[0] for check in checks
+    )
+    shared_inputs.ephem_provider.prefetch(telem_start, tstop)
+
+    # Run the candidates in parallel, each in its own process
+    results = {}
+    workers = os.cpu_count() or 1
+    for i0 in range(0, len(candidates), workers):
+        tasks = {
+            label: ForkedTask(run_candidate, checks, load_args, load_inputs)
+            for label, load_args, load_inputs in candidates[i0 : i0 + workers]
+        }
+        for label, task in tasks.items():
+            try:
+                results[label] = task.result()
+            except RuntimeError as msg:
+                print(f"ERROR in candidate {label}:", msg)
+                results[label] = {check.name: None for check in checks}
+
+    rows = []
+    for label in labels:
+        for check in checks:
+            summary = results[label][check.name]
+            if summary is None:
+                rows.append([label, check.name, np.nan, np.nan, -1, np.nan, "ERROR"])
+            else:
+                rows.append(
+                    [
+                        label,
+                        check.name,
+                        summary["max_temp"],
+                        summary["min_temp"],
+                        summary["num_viols"],
+                        summary["duration"],
+                        summary["first_viol"],
+                    ],
+                )
+    table = Table(
+        rows=rows,
+        names=[
+            "candidate",
+            "model",
+            "max_temp",
+            "min_temp",
+            "num_viols",
+            "viol_duration",
+            "first_viol",
+        ],
+    )
+    for name in ["max_temp", "min_temp", "viol_duration"]:
+        table[name].format = "%.2f"
+    if not args.outdir.exists():
+        args.outdir.mkdir(parents=True)
+    outfile = args.outdir / "comparison.csv"
+    mylog.info("Writing comparison table %s" % outfile)
+    table.write(outfile, format="ascii.csv", overwrite=True)
+    table.pprint(max_lines=-1, max_width=-1)
+
+    if any(row[-1] == "ERROR" for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,7 +33,7 @@ class DEACheck(ACISThermalCheck):
         hist_limit = [20.0]
         super().__init__("1deamzt", "dea", valid_limits, hist_limit)
 
-    def _calc_model_supp(self, model, state_times, states, ephem, state0):
+    def _calc_model_supp(self, model, sampler, states, ephem, state0):
         """
         Update to initialize the dea0 pseudo-node. If 1dpamzt
         has an initial value (T_dea) - which it does at
@@ -57,7 +57,7 @@ def main():
     args = get_options()
     dea_check = DEACheck()
     try:
-        dea_check.run(args)
+        sys.exit(dea_check.run(args))
     except Exception as msg:
         if args.traceback:
             raise
@@ -37,7 +37,7 @@ class DPACheck(ACISThermalCheck):
             hist_limit,
         )
 
-    def _calc_model_supp(self, model, state_times, states, ephem, state0):
+    def _calc_model_supp(self, model, sampler, states, ephem, state0):
         """
         Update to initialize the dpa0 pseudo-node. If 1dpamzt
         has an initial value (T_dpa) - which it does at
@@ -61,7 +61,7 @@ def main():
     args = get_options()
     dpa_check = DPACheck()
     try:
-        dpa_check.run(args)
+        sys.exit(dpa_check.run(args))
     except Exception as msg:
         if args.traceback:
             raise
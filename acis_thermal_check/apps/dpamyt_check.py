@@ -36,7 +36,7 @@ class DPAMYTCheck(ACISThermalCheck):
         # Call the superclass' __init__ with the arguments
         super().__init__("1dpamyt", "dpamyt", valid_limits, hist_limit)
 
-    def _calc_model_supp(self, model, state_times, states, ephem, state0):
+    def _calc_model_supp(self, model, sampler, states, ephem, state0):
         """
         Update to initialize the dpa0 pseudo-node. If 1dpamyt
         has an initial value (T_dpa) - which it does at
@@ -60,7 +60,7 @@ def main():
     args = get_options()
     dpamyt_check = DPAMYTCheck()
     try:
-        dpamyt_check.run(args)
+        sys.exit(dpamyt_check.run(args))
     except Exception as msg:
         if args.traceback:
             raise
@@ -36,7 +36,7 @@ def main():
     args = get_options()
     fep1_actel_check = FEP1ActelCheck()
     try:
-        fep1_actel_check.run(args)
+        sys.exit(fep1_actel_check.run(args))
     except Exception as msg:
         if args.traceback:
             raise
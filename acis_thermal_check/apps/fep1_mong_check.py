@@ -37,7 +37,7 @@ def main():
     args = get_options()
     fep1_mong_check = FEP1MongCheck()
     try:
-        fep1_mong_check.run(args)
+        sys.exit(fep1_mong_check.run(args))
     except Exception as msg:
         if args.traceback:
             raise
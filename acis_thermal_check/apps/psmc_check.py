@@ -39,7 +39,7 @@ class PSMCCheck(ACISThermalCheck):
             other_map={"1dahtbon": "dh_heater"},
         )
 
-    def _calc_model_supp(self, model, state_times, states, ephem, state0):
+    def _calc_model_supp(self, model, sampler, states, ephem, state0):
         # 1PIN1AT is broken, so we set its initial condition
         # using an offset, which makes sense based on historical
         # data
@@ -54,7 +54,7 @@ def main():
     args = get_options()
     psmc_check = PSMCCheck()
     try:
-        psmc_check.run(args)
+        sys.exit(psmc_check.run(args))
     except Exception as msg:
         if args.traceback:
             raise
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+"""
+========================
+run_all_checks
+========================
+
+This code runs several of the thermal model checks for a load in a
+single process. The model specifications, telemetry, commanded states
+and ephemeris are only obtained once and shared between all of the
+models. The outputs of each model are written to a subdirectory of
+the output directory with the name of the model.
+"""
+
+import sys
+
+import matplotlib
+
+from acis_thermal_check import get_options
+from acis_thermal_check.apps.acisfp_check import ACISFPCheck
+from acis_thermal_check.apps.bep_pcb_check import BEPPCBCheck
+from acis_thermal_check.apps.cea_check import CEACheck
+from acis_thermal_check.apps.dea_check import DEACheck
+from acis_thermal_check.apps.dpa_check import DPACheck
+from acis_thermal_check.apps.dpamyt_check import DPAMYTCheck
+from acis_thermal_check.apps.fep1_actel_check import FEP1ActelCheck
+from acis_thermal_check.apps.fep1_mong_check import FEP1MongCheck
+from acis_thermal_check.apps.psmc_check import PSMCCheck
+from acis_thermal_check.inputs import run_checks
+from acis_thermal_check.main import version
+
+# Matplotlib setup
+# Use Agg backend for command-line (non-interactive) operation
+matplotlib.use("Agg")
+
+check_classes = {
+    "dpa": DPACheck,
+    "dea": DEACheck,
+    "psmc": PSMCCheck,
+    "acisfp": ACISFPCheck,
+    "fep1_mong": FEP1MongCheck,
+    "fep1_actel": FEP1ActelCheck,
+    "bep_pcb": BEPPCBCheck,
+    "cea": CEACheck,
+    "dpamyt": DPAMYTCheck,
+}
+
+
+def main():
+    opts = [
+        (
+            "models",
+            {
+                "nargs": "+",
+                "choices": list(check_classes),
+                "default": list(check_classes),
+                "help": "The models to run. Default: all of them",
+            },
+        ),
+    ]
+    args = get_options(opts=opts)
+    if args.version:
+        print(f"acis_thermal_check version {version}")
+        return
+    if args.model_spec is not None or args.T_init is not None:
+        raise RuntimeError(
+            "--model-spec and --T-init cannot be used when running several models!"
+        )
+    checks = [check_classes[name]() for name in args.models]
+    failed = run_checks(checks, args)
+    if len(failed) > 0:
+        sys.exit(1)
+    if any(check.fast_check_status for check in checks):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+"""
+========================
+update_ephem_store
+========================
+
+This code creates or extends a precomputed ephemeris store, which
+holds the orbit and solar ephemeris on a uniform time grid in a
+memory-mapped file. It is meant to be run regularly (e.g. daily) so
+that the store picks up new predictive ephemeris, and the model runs
+can then interpolate the ephemeris from it with ``--ephem-store``.
+"""
+
+from argparse import ArgumentParser
+
+from cxotime import CxoTime
+
+from acis_thermal_check.ephemeris import EphemerisStore
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "store",
+        type=str,
+        help="The directory of the ephemeris store.",
+    )
+    parser.add_argument(
+        "--start",
+        help="Start time of a new store. Ignored if the store already "
+        "exists. Default: 60 days before the current time.",
+    )
+    parser.add_argument(
+        "--stop",
+        help="Time to extend the store to. Default: the end of the "
+        "ephemeris in the archive.",
+    )
+    parser.add_argument(
+        "--dt",
+        type=float,
+        default=60.0,
+        help="Spacing of the time grid of a new store in seconds. Ignored "
+        "if the store already exists. Default: 60.0",
+    )
+    parser.add_argument(
+        "--refresh",
+        type=float,
+        default=1.0,
+        help="Number of days before the current time from which the rows "
+        "of an existing store are recomputed. Default: 1.0",
+    )
+
+    args = parser.parse_args()
+
+    store = EphemerisStore.update(
+        args.store,
+        start=args.start,
+        stop=args.stop,
+        dt=args.dt,
+        refresh=args.refresh * 86400.0,
+    )
+    print(
+        f"Ephemeris store {args.store} covers {CxoTime(store.tstart).date} "
+        f"to {CxoTime(store.tstop).date}."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+
+"""
+========================
+validation_study
+========================
+
+This code validates a thermal model over a long window, e.g. a year,
+in bounded memory. The window is split into chunks, and each chunk is
+validated in a separate process, several at a time. For each chunk,
+only sketches of the distributions of the residuals (data - model) of
+each MSID are kept, which are merged to find the quantile table,
+histograms, and validation violations for the whole window. These are
+written to the output directory.
+"""
+
+import json
+import os
+import sys
+
+import matplotlib
+import numpy as np
+from cxotime import CxoTime
+from matplotlib.figure import Figure
+
+from acis_thermal_check import get_options, mylog
+from acis_thermal_check.apps.run_all_checks import check_classes
+from acis_thermal_check.main import version
+from acis_thermal_check.utils import ForkedTask, thermal_blue, thermal_red
+
+# Matplotlib setup
+# Use Agg backend for command-line (non-interactive) operation
+matplotlib.use("Agg")
+
+
+def sketch_chunk(check, model_spec, tstart, tstop, spin_up):
+    """
+    Validate a model over a chunk of the window, and sketch the
+    distributions of its residuals.
+
+    Parameters
+    ----------
+    check : ACISThermalCheck object
+        The model, which has been set up.
+    model_spec : dict
+        The model specification.
+    tstart : float
+        The start time of the chunk in seconds from the beginning of
+        the mission.
+    tstop : float
+        The stop time of the chunk in seconds from the beginning of
+        the mission.
+    spin_up : float
+        The number of days before the chunk from which the model is run,
+        so that the residuals are not dominated by the initial conditions.
+    """
+    days = (tstop - tstart) / 86400.0 + spin_up
+    tlm = check.get_telem_values(tstop, days=days)
+    states = check.state_builder.get_validation_states(tlm["date"][0], tlm["date"][-1])
+    model = check.calc_model(model_spec, states, tlm["date"][0], tlm["date"][-1])
+    return check.make_residual_sketches(tlm, model, tmin=tstart, tmax=tstop)
+
+
+def plot_histograms(msid, sketches, label, outdir):
+    """
+    Plot the histograms of the residuals of an MSID, with linear and
+    log scaling, like those of the validation of a model.
+
+    Parameters
+    ----------
+    msid : string
+        The MSID.
+    sketches : list of :class:`~acis_thermal_check.sketch.ResidualSketch`
+        The sketches of the residuals of the MSID.
+    label : string
+        The label of the x-axis.
+    outdir : Path
+        The directory to write the plot to.
+    """
+    scale = 1000.0 if msid == "tscpos" else 1.0
+    colors = [thermal_blue, thermal_red]
+    fig = Figure(figsize=(12.0, 3.5))
+    axes = fig.subplots(ncols=2)
+    for ax, histscale in zip(axes, ("log", "lin"), strict=True):
+        for sketch, color in zip(sketches, colors, strict=False):
+            if sketch.count == 0:
+                continue
+            counts, edges = sketch.histogram(bins=50)
+            ax.hist(
+                edges[:-1] / scale,
+                bins=edges / scale,
+                weights=counts,
+                log=(histscale == "log"),
+                histtype="step",
+                color=color,
+                linewidth=2,
+            )
+        ax.set_title(f"{msid.upper()} residuals: data - model")
+        ax.set_xlabel(label)
+    fig.subplots_adjust(bottom=0.18, left=0.15, wspace=0.6)
+    outfile = outdir / f"{msid}_valid_hist.png"
+    mylog.debug("Writing plot file %s" % outfile)
+    fig.savefig(outfile)
+
+
+def main():
+    opts = [
+        (
+            "model",
+            {
+                "choices": list(check_classes),
+                "required": True,
+                "help": "The model to validate.",
+            },
+        ),
+        (
+            "valid-chunk-days",
+            {
+                "type": float,
+                "default": 30.0,
+                "help": "Length of each chunk of the validation window in "
+                "days. Default: 30",
+            },
+        ),
+        (
+            "spin-up-days",
+            {
+                "type": float,
+                "default": 1.0,
+                "help": "Days before each chunk from which the model for the "
+                "chunk is run, whose residuals are not used. Default: 1",
+            },
+        ),
+        (
+            "workers",
+            {
+                "type": int,
+                "default": os.cpu_count() or 1,
+                "help": "Number of chunks to validate at the same time. "
+                "Default: the number of CPUs",
+            },
+        ),
+    ]
+    args = get_options(opts=opts)
+    if args.version:
+        print(f"acis_thermal_check version {version}")
+        return
+
+    # Only the validation is run
+    args.backstop_file = None
+    args.pred_only = False
+
+    check = check_classes[args.model]()
+    proc, model_spec, state_builder, hrc_states = check.setup(args)
+    check.state_builder = check._make_state_builder(args, state_builder, hrc_states)
+
+    # The window ends at the run start time and goes back --days days
+    tend = CxoTime(args.run_start).secs
+    tbegin = tend - args.days * 86400.0
+    edges = np.append(
+        np.arange(tbegin, tend, args.valid_chunk_days * 86400.0),
+        tend,
+    )
+    chunks = list(zip(edges[:-1], edges[1:], strict=True))
+    mylog.info(
+        "Validating the %s model from %s to %s in %d chunks",
+        check.name.upper(),
+        CxoTime(tbegin).date,
+        CxoTime(tend).date,
+        len(chunks),
+    )
+
+    # Validate the chunks in parallel, each in its own process, and
+    # merge the sketches of their residuals as they come in
+    sketches = None
+    failed = []
+    for i0 in range(0, len(chunks), args.workers):
+        tasks = {
+            (tstart, tstop): ForkedTask(
+                sketch_chunk,
+                check,
+                model_spec,
+                tstart,
+                tstop,
+                args.spin_up_days,
+            )
+            for tstart, tstop in chunks[i0 : i0 + args.workers]
+        }
+        for (tstart, tstop), task in tasks.items():
+            try:
+                chunk_sketches = task.result()
+            except RuntimeError as msg:
+                print(
+                    f"ERROR in chunk {CxoTime(tstart).date} - {CxoTime(tstop).date}:",
+                    msg,
+                )
+                failed.append((tstart, tstop))
+                continue
+            if sketches is None:
+                sketches = chunk_sketches
+            else:
+                for msid, msid_sketches in chunk_sketches.items():
+                    for sketch, chunk_sketch in zip(
+                        sketches[msid], msid_sketches, strict=True
+                    ):
+                        sketch.merge(chunk_sketch)
+    if sketches is None:
+        print("ERROR: none of the chunks could be validated!")
+        sys.exit(1)
+
+    # Write the quantile table for the whole window
+    quantiles = check._valid_quantiles
+    fmts = check.get_validation_formats()
+    labels = check.get_validation_labels()
+    quant_table = ",".join(["MSID"] + ["quant%d" % x for x in quantiles]) + "\n"
+    plots_validation = {}
+    for msid, msid_sketches in sketches.items():
+        if msid_sketches[0].count == 0:
+            mylog.warning("No residuals of %s to find the quantiles of", msid)
+            continue
+        plot = {}
+        quant_line = "%s" % msid
+        for quant, quant_val in msid_sketches[0].quantiles(quantiles).items():
+            plot["quant%02d" % quant] = fmts[msid] % quant_val
+            quant_line += "," + fmts[msid] % quant_val
+        quant_table += quant_line + "\n"
+        plots_validation[msid] = plot
+        plot_histograms(msid, msid_sketches, labels[msid], args.outdir)
+    filename = args.outdir / "validation_quant.csv"
+    mylog.info("Writing quantile table %s" % filename)
+    with open(filename, "w") as f:
+        f.write(quant_table)
+
+    valid_viols = check.make_validation_viols(plots_validation)
+    filename = args.outdir / "validation_viols.json"
+    mylog.info("Writing validation violations %s" % filename)
+    with open(filename, "w") as f:
+        json.dump(valid_viols, f, indent=4)
+
+    if len(failed) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
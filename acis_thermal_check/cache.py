@@ -0,0 +1,784 @@
+import copy
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import ska_numpy
+from cxotime import CxoTime
+
+from acis_thermal_check.utils import mylog
+
+# Length of a 5-minute statistics bin in the engineering archive
+STAT_DT = 328.0
+
+
+class CachedMSID:
+    """
+    A minimal stand-in for a cheta MSID object, holding only the
+    times and values which ACISThermalCheck uses.
+
+    Parameters
+    ----------
+    msid : string
+        The name of the MSID.
+    times : NumPy array
+        Times in seconds from the beginning of the mission.
+    vals : NumPy array
+        The values of the MSID at *times*.
+    """
+
+    def __init__(self, msid, times, vals):
+        self.msid = msid
+        self.times = times
+        self.vals = vals
+
+
+class CachedMSIDset(OrderedDict):
+    """
+    A minimal stand-in for a cheta MSIDset object, built from
+    telemetry served by a :class:`TelemetryCache`.
+    """
+
+    def interpolate(self, dt, start, stop):
+        """
+        Nearest-neighbor interpolate all of the MSIDs onto a common
+        set of times, *dt* seconds apart, between *start* and *stop*.
+        The times are the same as those of ``MSIDset.interpolate`` in
+        cheta, so that cached and fetched telemetry give the same
+        results.
+
+        Parameters
+        ----------
+        dt : float
+            The spacing of the new times in seconds.
+        start : float
+            The first time in seconds from the beginning of the mission.
+            It is moved later if any MSID starts after it.
+        stop : float
+            The last time in seconds from the beginning of the mission.
+            It is moved earlier if any MSID ends before it.
+        """
+        start = max(start, *(msid.times[0] for msid in self.values()))
+        stop = min(stop, *(msid.times[-1] for msid in self.values()))
+        self.times = np.arange((stop - start) // dt + 1) * dt + start
+        for msid in self.values():
+            idxs = ska_numpy.interpolate(
+                np.arange(len(msid.times)),
+                msid.times,
+                self.times,
+                method="nearest",
+            )
+            msid.vals = msid.vals[idxs]
+            msid.times = self.times
+
+
+class TelemetryCache:
+    """
+    A persistent on-disk cache of engineering archive telemetry.
+
+    The values for each MSID and statistic are stored in a separate
+    file, along with the time spans which they cover. These spans
+    need not be contiguous, so that requests for separate intervals
+    (e.g., the chunks of a validation study) add to the cache rather
+    than replace each other. When telemetry is requested, only the
+    samples after the end of the cached span which covers the start
+    time (or the whole interval, if no span covers it) are fetched
+    from the archive, merged into the cache, and the rest are served
+    from disk.
+
+    Parameters
+    ----------
+    cache_dir : string or Path
+        The root directory of the cache. Telemetry is stored in
+        the "telem" subdirectory, which is created if necessary.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir) / "telem"
+        if not self.cache_dir.exists():
+            self.cache_dir.mkdir(parents=True)
+
+    def _cache_file(self, msid, stat):
+        return self.cache_dir / f"{msid.lower()}_{stat}.npz"
+
+    def _read(self, msid, stat):
+        cache_file = self._cache_file(msid, stat)
+        if not cache_file.exists():
+            return None
+        with np.load(cache_file) as f:
+            times, vals = f["times"], f["vals"]
+            # Files written before spans were kept hold a single span
+            if "spans" in f:
+                spans = f["spans"]
+            elif times.size > 0:
+                spans = np.array([[times[0], times[-1]]])
+        if times.size == 0:
+            return None
+        return times, vals, spans
+
+    def _write(self, msid, stat, times, vals, spans):
+        # Write to a temporary file first and then move it into place, so
+        # that a concurrent reader never sees a partially written file
+        cache_file = self._cache_file(msid, stat)
+        tmp_file = cache_file.with_name(f"{cache_file.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp_file, times=times, vals=vals, spans=spans)
+        os.replace(tmp_file, cache_file)
+
+    @staticmethod
+    def _find_span(cached, t):
+        """
+        Find the cached span which covers the time *t*, allowing for
+        *t* to fall up to one statistics bin before the first sample.
+        Returns None if no span covers it.
+        """
+        if cached is None:
+            return None
+        for span_start, span_stop in cached[2]:
+            if span_start - STAT_DT <= t <= span_stop:
+                return span_start, span_stop
+        return None
+
+    @staticmethod
+    def _merge(old, new_times, new_vals):
+        """
+        Merge newly fetched samples into the cached ones. New samples
+        replace any cached samples in the time span they cover, and
+        that span is added to the cached spans, joining any spans which
+        it overlaps or abuts. Spans which are disjoint from it are kept.
+        """
+        if new_times.size == 0:
+            return old
+        new_span = [new_times[0], new_times[-1]]
+        if old is None:
+            return new_times, new_vals, np.array([new_span])
+        old_times, old_vals, old_spans = old
+        before = old_times < new_times[0]
+        after = old_times > new_times[-1]
+        times = np.concatenate([old_times[before], new_times, old_times[after]])
+        vals = np.concatenate([old_vals[before], new_vals, old_vals[after]])
+        spans = []
+        for span in sorted([*old_spans.tolist(), new_span]):
+            if spans and span[0] <= spans[-1][1] + STAT_DT:
+                spans[-1][1] = max(spans[-1][1], span[1])
+            else:
+                spans.append(list(span))
+        return times, vals, np.array(spans)
+
+    def get_msidset(self, msids, start, stop, stat="5min"):
+        """
+        Get telemetry for a list of MSIDs between *start* and *stop*,
+        fetching from the engineering archive only what is not
+        already in the cache.
+
+        Parameters
+        ----------
+        msids : list of strings
+            The MSIDs to get.
+        start : string or float
+            The start time of the telemetry.
+        stop : string or float
+            The stop time of the telemetry.
+        stat : string, optional
+            The archive statistic to fetch. Default: "5min"
+
+        Returns
+        -------
+        :class:`CachedMSIDset`
+        """
+        import cheta.fetch_sci as fetch
+
+        tstart = CxoTime(start).secs
+        tstop = CxoTime(stop).secs
+
+        cached = {msid: self._read(msid, stat) for msid in msids}
+
+        # MSIDs which have no cached span covering the start time are
+        # fetched for the full interval. The others only need the samples
+        # after the end of that span, which we refetch in case it was
+        # incomplete.
+        full_msids = []
+        tail_msids = {}
+        for msid, c in cached.items():
+            span = self._find_span(c, tstart)
+            if span is None:
+                full_msids.append(msid)
+            elif span[1] < tstop:
+                tail_msids[msid] = span[1]
+
+        fetches = []
+        if full_msids:
+            fetches.append((full_msids, tstart))
+        if tail_msids:
+            fetches.append((list(tail_msids), min(tail_msids.values())))
+        for fetch_msids, fetch_start in fetches:
+            mylog.info(
+                "Fetching %s telemetry for %s between %s and %s",
+                stat,
+                ", ".join(fetch_msids),
+                CxoTime(fetch_start).date,
+                CxoTime(tstop).date,
+            )
+            msidset = fetch.MSIDset(fetch_msids, fetch_start, tstop, stat=stat)
+            for msid in fetch_msids:
+                # Merge into what is on disk now rather than what we read
+                # above, in case another process has added to it since
+                cached[msid] = self._merge(
+                    self._read(msid, stat),
+                    msidset[msid].times,
+                    msidset[msid].vals,
+                )
+                if cached[msid] is not None:
+                    self._write(msid, stat, *cached[msid])
+
+        out = CachedMSIDset()
+        for msid in msids:
+            if cached[msid] is None:
+                raise ValueError(f"No {stat} telemetry found for {msid}!")
+            times, vals, _ = cached[msid]
+            ok = (times >= tstart) & (times < tstop)
+            out[msid] = CachedMSID(msid, times[ok], vals[ok])
+        return out
+
+
+class CachedComponent:
+    """
+    A minimal stand-in for a xija model component, holding only the
+    model and data values which were kept in a :class:`ModelCache`.
+
+    Parameters
+    ----------
+    name : string
+        The name of the component.
+    mvals : NumPy array, optional
+        The model values of the component.
+    dvals : NumPy array, optional
+        The data values of the component.
+    """
+
+    def __init__(self, name, mvals=None, dvals=None):
+        self.name = name
+        self._mvals = mvals
+        self._dvals = dvals
+
+    @property
+    def mvals(self):
+        if self._mvals is None:
+            raise AttributeError(f"Model values of {self.name} were not cached!")
+        return self._mvals
+
+    @property
+    def dvals(self):
+        if self._dvals is None:
+            raise AttributeError(f"Data values of {self.name} were not cached!")
+        return self._dvals
+
+
+class CachedModel:
+    """
+    A minimal stand-in for a xija ThermalModel which has been
+    calculated, built from the results kept in a :class:`ModelCache`.
+
+    Parameters
+    ----------
+    name : string
+        The name of the model.
+    times : NumPy array
+        The times of the model.
+    comp : dict of :class:`CachedComponent`
+        The cached components of the model, keyed by name.
+    bad_times : list, optional
+        The bad times of the model, if it has any.
+    """
+
+    def __init__(self, name, times, comp, bad_times=None):
+        self.name = name
+        self.times = times
+        self.comp = comp
+        if bad_times is not None:
+            self.bad_times = bad_times
+
+
+class ModelCache:
+    """
+    A persistent on-disk cache of the results of thermal model runs.
+
+    Each result is stored in a file named after a hash of all of the
+    inputs to the model run (the model specification, the commanded
+    states, the start and stop times, the initial state, and the
+    ephemeris), so that a model run with identical inputs can skip
+    the integration and use the stored results instead.
+
+    Results which have not been used for *max_days* days are removed
+    when the cache is opened.
+
+    Parameters
+    ----------
+    cache_dir : string or Path
+        The root directory of the cache. Model results are stored in
+        the "models" subdirectory, which is created if necessary.
+    max_days : float, optional
+        The number of days after which unused results are removed.
+        Default: 30.0
+    """
+
+    def __init__(self, cache_dir, max_days=30.0):
+        self.cache_dir = Path(cache_dir) / "models"
+        if not self.cache_dir.exists():
+            self.cache_dir.mkdir(parents=True)
+        self.max_days = max_days
+        self.prune()
+
+    def _cache_file(self, key):
+        return self.cache_dir / f"{key}.npz"
+
+    def prune(self):
+        """
+        Remove the results which have not been used for ``max_days``
+        days. Results are marked as used when they are stored and
+        whenever they are read.
+        """
+        t_oldest = time.time() - self.max_days * 86400.0
+        for cache_file in self.cache_dir.glob("*.npz"):
+            try:
+                if cache_file.stat().st_mtime < t_oldest:
+                    cache_file.unlink()
+            except FileNotFoundError:
+                # Another process removed or replaced it first
+                pass
+
+    @staticmethod
+    def make_key(name, model_spec, states, tstart, tstop, state0, ephem, extra=()):
+        """
+        Make the key for a model run from a hash of its inputs.
+
+        Parameters
+        ----------
+        name : string
+            The name of the model.
+        model_spec : dict
+            The model specification.
+        states : NumPy record array or astropy Table
+            The commanded states.
+        tstart : float
+            The start time of the model run.
+        tstop : float
+            The end time of the model run.
+        state0 : dict or None
+            The initial state of the model run.
+        ephem : dict of NumPy arrays
+            The ephemeris interpolated to the model times.
+        extra : tuple of strings, optional
+            Anything else which determines the results of the model
+            run, such as software versions.
+        """
+        import hashlib
+        import json
+
+        h = hashlib.sha256()
+        h.update(name.encode())
+        h.update(json.dumps(model_spec, sort_keys=True).encode())
+        for colname in sorted(states.dtype.names):
+            h.update(colname.encode())
+            h.update(np.ascontiguousarray(states[colname]).tobytes())
+        h.update(repr((float(tstart), float(tstop))).encode())
+        if state0 is not None:
+            h.update(json.dumps(state0, sort_keys=True, default=str).encode())
+        for msid in sorted(ephem):
+            h.update(np.ascontiguousarray(ephem[msid]).tobytes())
+        for item in extra:
+            h.update(str(item).encode())
+        return h.hexdigest()
+
+    def get(self, key, name):
+        """
+        Get the cached results of a model run, or None if there are none.
+
+        Parameters
+        ----------
+        key : string
+            The key of the model run from :meth:`make_key`.
+        name : string
+            The name of the model.
+
+        Returns
+        -------
+        :class:`CachedModel` or None
+        """
+        cache_file = self._cache_file(key)
+        if not cache_file.exists():
+            return None
+        # Mark the results as used, so that they are not pruned
+        os.utime(cache_file)
+        comp = {}
+        with np.load(cache_file) as f:
+            times = f["times"]
+            bad_times = f["bad_times"].tolist() if "bad_times" in f else None
+            for item in f.files:
+                attr, _, comp_name = item.partition("__")
+                if attr not in ["mvals", "dvals"]:
+                    continue
+                if comp_name not in comp:
+                    comp[comp_name] = CachedComponent(comp_name)
+                setattr(comp[comp_name], f"_{attr}", f[item])
+        return CachedModel(name, times, comp, bad_times=bad_times)
+
+    def put(self, key, model, mvals, dvals):
+        """
+        Store the results of a model run in the cache.
+
+        Parameters
+        ----------
+        key : string
+            The key of the model run from :meth:`make_key`.
+        model : xija.ThermalModel
+            The model, which has been calculated.
+        mvals : list of strings
+            The names of the components whose model values are stored.
+        dvals : list of strings
+            The names of the components whose data values are stored.
+        """
+        arrays = {"times": model.times}
+        for attr, names in [("mvals", mvals), ("dvals", dvals)]:
+            for comp_name in names:
+                if comp_name in model.comp:
+                    arrays[f"{attr}__{comp_name}"] = getattr(
+                        model.comp[comp_name], attr
+                    )
+        if hasattr(model, "bad_times"):
+            arrays["bad_times"] = np.array(model.bad_times, dtype=str)
+        # Write to a temporary file first and then move it into place, so
+        # that a concurrent reader never sees a partially written file
+        cache_file = self._cache_file(key)
+        tmp_file = cache_file.with_name(f"{key}.{os.getpid()}.tmp.npz")
+        np.savez(tmp_file, **arrays)
+        os.replace(tmp_file, cache_file)
+
+
+class CheckpointStore:
+    """
+    A persistent on-disk store of the validation history of a thermal
+    model, with daily checkpoints of the temperatures of all of the
+    nodes (including pseudo-nodes) which the model predicts.
+
+    A validation run can resume from the latest checkpoint and only
+    integrate the model from there, and the stored history is then
+    stitched back in before it, so that validation windows much longer
+    than the new interval cost little more than the new interval.
+
+    The history is tied to a key made from the model specification and
+    software versions, and is discarded if the key changes.
+
+    Parameters
+    ----------
+    cache_dir : string or Path
+        The root directory of the cache. Checkpoints are stored in the
+        "checkpoints" subdirectory, which is created if necessary.
+    name : string
+        The name of the model.
+    key : string
+        The key of the model specification and software versions.
+    max_days : float, optional
+        The length of history, in days before the end of the latest
+        validation run, which is kept. Default: 365.0
+    """
+
+    def __init__(self, cache_dir, name, key, max_days=365.0):
+        self.cache_dir = Path(cache_dir) / "checkpoints"
+        if not self.cache_dir.exists():
+            self.cache_dir.mkdir(parents=True)
+        self.name = name
+        self.key = key
+        self.max_days = max_days
+        self.cache_file = self.cache_dir / f"{name}.npz"
+        self.history = self._read()
+
+    def _read(self):
+        if not self.cache_file.exists():
+            return None
+        with np.load(self.cache_file) as f:
+            history = {item: f[item] for item in f.files}
+        if str(history.pop("key")) != self.key:
+            mylog.info(
+                "The %s model has changed, discarding its validation history",
+                self.name.upper(),
+            )
+            return None
+        return history
+
+    def latest_checkpoint(self, start, stop, min_interval=86400.0):
+        """
+        Get the latest checkpoint from which a validation run between
+        *start* and *stop* can resume. The stored history must reach
+        back to *start*, and the checkpoint must be at least
+        *min_interval* seconds before *stop*.
+
+        Parameters
+        ----------
+        start : float
+            The start time of the validation run.
+        stop : float
+            The stop time of the validation run.
+        min_interval : float, optional
+            The minimum length of the new interval in seconds.
+            Default: 86400.0
+
+        Returns
+        -------
+        The time of the checkpoint and a dictionary of the node
+        temperatures at that time, or None if there is no checkpoint.
+        """
+        if self.history is None:
+            return None
+        times = self.history["times"]
+        if times[0] > start + STAT_DT:
+            return None
+        ckpt_times = self.history["ckpt_times"]
+        ok = (ckpt_times > start) & (ckpt_times <= stop - min_interval)
+        if not np.any(ok):
+            return None
+        i = np.flatnonzero(ok)[-1]
+        nodes = {
+            item.partition("__")[2]: float(vals[i])
+            for item, vals in self.history.items()
+            if item.startswith("ckpt__")
+        }
+        return ckpt_times[i], nodes
+
+    def stitch(self, model, start):
+        """
+        Stitch the stored history from *start* up to the beginning of a
+        model run in front of that run.
+
+        Parameters
+        ----------
+        model : xija.ThermalModel or :class:`CachedModel`
+            The model run which resumed from a checkpoint.
+        start : float
+            The start time of the validation run.
+
+        Returns
+        -------
+        :class:`CachedModel`
+        """
+        times = self.history["times"]
+        before = (times >= start - STAT_DT / 2) & (times < model.times[0] - STAT_DT / 2)
+        comp = {}
+        for item, vals in self.history.items():
+            attr, _, comp_name = item.partition("__")
+            if attr not in ["mvals", "dvals"] or comp_name not in model.comp:
+                continue
+            new_vals = getattr(model.comp[comp_name], attr)
+            if comp_name not in comp:
+                comp[comp_name] = CachedComponent(comp_name)
+            setattr(
+                comp[comp_name],
+                f"_{attr}",
+                np.concatenate([vals[before], new_vals]),
+            )
+        return CachedModel(
+            self.name,
+            np.concatenate([times[before], model.times]),
+            comp,
+            bad_times=getattr(model, "bad_times", None),
+        )
+
+    def update(self, model, mvals, dvals, nodes):
+        """
+        Add a validation run to the stored history, replacing any
+        history from the start of the run onward, and add daily
+        checkpoints of the node temperatures in the run.
+
+        Parameters
+        ----------
+        model : xija.ThermalModel or :class:`CachedModel`
+            The validation model run.
+        mvals : list of strings
+            The names of the components whose model values are stored.
+        dvals : list of strings
+            The names of the components whose data values are stored.
+        nodes : dict of NumPy arrays
+            The temperatures of the nodes at the times of the model run.
+        """
+        times = model.times
+        arrays = {"times": times}
+        for attr, names in [("mvals", mvals), ("dvals", dvals)]:
+            for comp_name in names:
+                if comp_name in model.comp:
+                    arrays[f"{attr}__{comp_name}"] = getattr(
+                        model.comp[comp_name], attr
+                    )
+
+        # A checkpoint is kept at the first model time of each day
+        day = np.floor(times / 86400.0)
+        idxs = np.flatnonzero(np.diff(day)) + 1
+        arrays["ckpt_times"] = times[idxs]
+        for node, vals in nodes.items():
+            arrays[f"ckpt__{node}"] = vals[idxs]
+
+        old = self.history
+        if old is not None and set(old) == set(arrays):
+            # Keep the old history and checkpoints from before the run
+            keep = old["times"] < times[0] - STAT_DT / 2
+            keep_ckpt = old["ckpt_times"] < times[0]
+            for item, vals in arrays.items():
+                if item.startswith("ckpt"):
+                    arrays[item] = np.concatenate([old[item][keep_ckpt], vals])
+                else:
+                    arrays[item] = np.concatenate([old[item][keep], vals])
+
+        # Drop history which is older than we need
+        keep = arrays["times"] >= times[-1] - self.max_days * 86400.0
+        keep_ckpt = arrays["ckpt_times"] >= times[-1] - self.max_days * 86400.0
+        for item in arrays:
+            if item.startswith("ckpt"):
+                arrays[item] = arrays[item][keep_ckpt]
+            else:
+                arrays[item] = arrays[item][keep]
+
+        self.history = arrays
+        # Write to a temporary file first and then move it into place, so
+        # that a concurrent reader never sees a partially written file
+        tmp_file = self.cache_file.with_name(
+            f"{self.cache_file.stem}.{os.getpid()}.tmp.npz"
+        )
+        np.savez(tmp_file, key=self.key, **arrays)
+        os.replace(tmp_file, self.cache_file)
+
+
+# Heater histories which have already been read in this process, keyed
+# by the path and modification time of the RDB file
+_heater_histories = {}
+
+
+def get_dahtbon_history(rdb_file, cache_dir=None):
+    """
+    Get the history of the detector housing heater state from an RDB
+    file. The file is only parsed once per process, and the history is
+    shared between all of the models which use it. If a cache directory
+    is given, the parsed history is also kept there in binary form, and
+    is reused by later processes until the RDB file is modified.
+
+    Parameters
+    ----------
+    rdb_file : string or Path
+        The RDB file with the dates of the heater commands in the "time"
+        column and the heater state in the "dahtbon" column.
+    cache_dir : string or Path, optional
+        The root directory of the cache. The history is stored in the
+        "heater" subdirectory, which is created if necessary. Default:
+        None, which means the history is not cached on disk.
+
+    Returns
+    -------
+    The times of the heater commands in seconds from the beginning of
+    the mission, and the heater state after each of them.
+    """
+    rdb_file = Path(rdb_file)
+    mtime = rdb_file.stat().st_mtime_ns
+    key = (str(rdb_file.resolve()), mtime)
+    if key in _heater_histories:
+        return _heater_histories[key]
+
+    cache_file = None
+    history = None
+    if cache_dir is not None:
+        cache_dir = Path(cache_dir) / "heater"
+        if not cache_dir.exists():
+            cache_dir.mkdir(parents=True)
+        cache_file = cache_dir / f"{rdb_file.stem}.npz"
+        if cache_file.exists():
+            with np.load(cache_file) as f:
+                if f["path"] == key[0] and f["mtime"] == mtime:
+                    history = f["times"], f["state"]
+
+    if history is None:
+        from astropy.io import ascii
+
+        mylog.info("Reading file of dahtrb commands from file %s" % rdb_file)
+        htrb = ascii.read(rdb_file, format="rdb")
+        history = CxoTime(htrb["time"]).secs, np.asarray(htrb["dahtbon"], dtype=bool)
+        if cache_file is not None:
+            tmp_file = cache_file.with_name(f"{cache_file.stem}.{os.getpid()}.tmp.npz")
+            np.savez(
+                tmp_file,
+                path=key[0],
+                mtime=mtime,
+                times=history[0],
+                state=history[1],
+            )
+            os.replace(tmp_file, cache_file)
+
+    _heater_histories[key] = history
+    return history
+
+
+# Model specifications which have already been obtained in this process,
+# keyed by the model name and the chandra_models version asked for
+_model_specs = {}
+
+
+def get_model_spec(name, version=None, cache_dir=None):
+    """
+    Get the model specification for a model from chandra_models. Each
+    specification is only obtained once per process. If a cache
+    directory is given, the specifications are also kept there, keyed
+    by the model name and chandra_models version, so that later runs
+    which ask for the same version of chandra_models do not need to
+    look it up in the repository.
+
+    Parameters
+    ----------
+    name : string
+        The name of the model.
+    version : string, optional
+        The version of chandra_models to use. Default: None, which means
+        the latest version, which has to be looked up in the repository
+        by every process.
+    cache_dir : string or Path, optional
+        The root directory of the cache. The specifications are stored in
+        the "specs" subdirectory, which is created if necessary. Default:
+        None, which means the specifications are not cached on disk.
+
+    Returns
+    -------
+    A copy of the model specification, and the chandra_models version
+    it came from.
+    """
+    key = (name, version)
+    if key not in _model_specs:
+        spec_dir = None
+        if cache_dir is not None:
+            spec_dir = Path(cache_dir) / "specs"
+            if not spec_dir.exists():
+                spec_dir.mkdir(parents=True)
+        cache_file = None
+        if spec_dir is not None and version is not None:
+            cache_file = spec_dir / f"{name}_{version}.json"
+        if cache_file is not None and cache_file.exists():
+            mylog.info(
+                "Reading %s model specification for chandra_models v%s from %s",
+                name,
+                version,
+                cache_file,
+            )
+            with open(cache_file) as f:
+                _model_specs[key] = json.load(f), version
+        else:
+            from xija.get_model_spec import get_xija_model_spec
+
+            model_spec, cm_version = get_xija_model_spec(name, version=version)
+            _model_specs[key] = model_spec, cm_version
+            _model_specs[name, cm_version] = _model_specs[key]
+            if spec_dir is not None:
+                cache_file = spec_dir / f"{name}_{cm_version}.json"
+                tmp_file = cache_file.with_name(
+                    f"{cache_file.stem}.{os.getpid()}.tmp.json"
+                )
+                with open(tmp_file, "w") as f:
+                    json.dump(model_spec, f)
+                os.replace(tmp_file, cache_file)
+    model_spec, cm_version = _model_specs[key]
+    return copy.deepcopy(model_spec), cm_version
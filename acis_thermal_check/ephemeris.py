@@ -0,0 +1,340 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import ska_numpy
+from cxotime import CxoTime
+
+from acis_thermal_check.utils import mylog
+
+ephem_msids = [f"orbitephem0_{axis}" for axis in "xyz"] + [
+    f"solarephem0_{axis}" for axis in "xyz"
+]
+
+
+class EphemerisStore:
+    """
+    A store of the orbit and solar ephemeris, precomputed on a uniform
+    time grid and kept in a memory-mapped binary file, so that it can
+    be interpolated without going through the engineering archive and
+    many concurrent model runs can share one page-cached copy of it.
+
+    The store is a directory with two files: "ephem.dat", which holds
+    the ephemeris as a C-ordered array of 64-bit floats with one row
+    per grid time and one column per ephemeris MSID, and "ephem.json",
+    which holds the start time, spacing, and number of rows of the
+    grid. The store is created and extended with :meth:`update`.
+
+    Parameters
+    ----------
+    path : string or Path
+        The directory of the store.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / "ephem.json") as f:
+            header = json.load(f)
+        if header["msids"] != ephem_msids:
+            raise ValueError(f"Unexpected ephemeris MSIDs in {self.path}!")
+        self.t0 = header["t0"]
+        self.dt = header["dt"]
+        self.n = header["n"]
+        self.data = np.memmap(
+            self.path / "ephem.dat",
+            dtype=np.float64,
+            mode="r",
+            shape=(self.n, len(ephem_msids)),
+        )
+
+    @property
+    def tstart(self):
+        return self.t0
+
+    @property
+    def tstop(self):
+        return self.t0 + (self.n - 1) * self.dt
+
+    def covers(self, start, stop):
+        """
+        Whether or not the store covers the times between
+        *start* and *stop*.
+
+        Parameters
+        ----------
+        start : float
+            The start time in seconds from the beginning of the mission.
+        stop : float
+            The stop time in seconds from the beginning of the mission.
+        """
+        return start >= self.tstart and stop <= self.tstop
+
+    def get_ephemeris(self, times):
+        """
+        Get the orbit and solar ephemeris interpolated to a set of times,
+        which must be covered by the store.
+
+        Parameters
+        ----------
+        times : NumPy array
+            The times to interpolate the ephemeris to.
+        """
+        # Only the rows of the grid which bracket the times are read
+        i0 = max(int(np.floor((times[0] - self.t0) / self.dt)), 0)
+        i1 = min(int(np.ceil((times[-1] - self.t0) / self.dt)) + 1, self.n)
+        grid = self.t0 + np.arange(i0, i1) * self.dt
+        ephem = {}
+        for i, msid in enumerate(ephem_msids):
+            ephem[msid] = np.interp(times, grid, self.data[i0:i1, i])
+        return ephem
+
+    @classmethod
+    def update(cls, path, start=None, stop=None, dt=60.0, refresh=86400.0):
+        """
+        Create or extend a store with the ephemeris from the engineering
+        archive. The rows of the grid from *refresh* seconds before the
+        current time onward are recomputed, so that they pick up newer
+        predictive ephemeris. Existing rows are never rewritten in place,
+        since model runs may be reading the store: new rows are appended,
+        or if existing rows are recomputed, a new file replaces the old.
+
+        Parameters
+        ----------
+        path : string or Path
+            The directory of the store. It is created if it does not exist.
+        start : string or float, optional
+            The start time of a new store. Ignored if the store already
+            exists. Default: 60 days before the current time.
+        stop : string or float, optional
+            The time to extend the store to. Default: the end of the
+            ephemeris in the archive.
+        dt : float, optional
+            The spacing in seconds of the grid of a new store. Ignored if
+            the store already exists. Default: 60.0
+        refresh : float, optional
+            The time in seconds before the current time from which the
+            rows of an existing store are recomputed. Default: 86400.0
+        """
+        import cheta.fetch_sci as fetch
+
+        path = Path(path)
+        header_file = path / "ephem.json"
+        data_file = path / "ephem.dat"
+        if header_file.exists():
+            with open(header_file) as f:
+                header = json.load(f)
+            t0, dt, n = header["t0"], header["dt"], header["n"]
+            # Recompute the rows from the refresh time onward, but
+            # no later than just after the last row
+            t_refresh = CxoTime().secs - refresh
+            i_start = min(int(np.ceil((t_refresh - t0) / dt)), n)
+            i_start = max(i_start, 0)
+        else:
+            if not path.exists():
+                path.mkdir(parents=True)
+            if start is None:
+                start = CxoTime().secs - 60.0 * 86400.0
+            t0 = CxoTime(start).secs
+            n = 0
+            i_start = 0
+        fetch_start = t0 + i_start * dt - 2000.0
+        fetch_stop = None if stop is None else CxoTime(stop).secs + 2000.0
+        mylog.info("Fetching ephemeris from %s", CxoTime(fetch_start).date)
+        e = fetch.MSIDset(ephem_msids, fetch_start, fetch_stop)
+        # The grid ends at the last time covered by all of the MSIDs
+        t_last = min(e[msid].times[-1] for msid in ephem_msids)
+        if stop is not None:
+            t_last = min(t_last, CxoTime(stop).secs)
+        i_stop = int(np.floor((t_last - t0) / dt)) + 1
+        if i_stop <= i_start:
+            mylog.info("No new ephemeris to add to %s", path)
+            return cls(path)
+        grid = t0 + np.arange(i_start, i_stop) * dt
+        rows = np.empty((grid.size, len(ephem_msids)), dtype=np.float64)
+        for i, msid in enumerate(ephem_msids):
+            rows[:, i] = ska_numpy.interpolate(e[msid].vals, e[msid].times, grid)
+        # The rows which are not recomputed are kept, even if they are
+        # after the new ones
+        n_new = max(n, i_stop)
+        row_size = rows.itemsize * len(ephem_msids)
+        if i_start >= n and data_file.exists():
+            # Rows which are only added after the end of the file are
+            # never seen by the readers of the file, so they can be
+            # appended in place
+            with open(data_file, "r+b") as f:
+                f.seek(i_start * row_size)
+                f.write(rows.tobytes())
+        else:
+            # Rows which readers may have mapped are never rewritten in
+            # place. Instead, a new file is written and moved into place,
+            # and existing readers keep the old one.
+            tmp_file = path / f"ephem.{os.getpid()}.tmp.dat"
+            with open(tmp_file, "wb") as f:
+                if n > 0:
+                    old = np.memmap(
+                        data_file,
+                        dtype=np.float64,
+                        mode="r",
+                        shape=(n, len(ephem_msids)),
+                    )
+                    f.write(old[:i_start].tobytes())
+                    f.write(rows.tobytes())
+                    f.write(old[i_stop:].tobytes())
+                    del old
+                else:
+                    f.write(rows.tobytes())
+            os.replace(tmp_file, data_file)
+        # The header is only updated once the rows have been written, so
+        # that readers never see rows which have not been written yet
+        tmp_file = path / f"ephem.{os.getpid()}.tmp.json"
+        with open(tmp_file, "w") as f:
+            json.dump({"t0": t0, "dt": dt, "n": n_new, "msids": ephem_msids}, f)
+        os.replace(tmp_file, header_file)
+        mylog.info(
+            "Ephemeris store %s now covers %s to %s",
+            path,
+            CxoTime(t0).date,
+            CxoTime(t0 + (n_new - 1) * dt).date,
+        )
+        return cls(path)
+
+
+class EphemerisProvider:
+    """
+    Provides the orbit and solar ephemeris for the thermal model runs.
+
+    The ephemeris for the full span needed by all of the model runs
+    (typically validation plus prediction) is fetched from the
+    engineering archive in one request, and interpolated slices of it
+    are served to each model run. If a model run asks for a span which
+    has not been fetched, the ephemeris is fetched again for the union
+    of the old and new spans.
+
+    If an :class:`EphemerisStore` is given, the ephemeris for any span
+    which it covers is interpolated from it instead.
+
+    Parameters
+    ----------
+    pad : float, optional
+        The amount of time in seconds by which the fetched span is
+        extended on either side, so that interpolation at the ends of
+        the span is well-defined. Default: 2000.0
+    store : :class:`EphemerisStore`, optional
+        A precomputed ephemeris store to use where it covers the
+        times asked for. Default: None
+    """
+
+    msids = ephem_msids
+
+    def __init__(self, pad=2000.0, store=None):
+        self.pad = pad
+        self.store = store
+        self._ephem = None
+        self._span = None
+
+    def covers(self, start, stop):
+        """
+        Whether or not the ephemeris which has already been fetched
+        covers the times between *start* and *stop*.
+
+        Parameters
+        ----------
+        start : float
+            The start time in seconds from the beginning of the mission.
+        stop : float
+            The stop time in seconds from the beginning of the mission.
+        """
+        return (
+            self._span is not None
+            and start - self.pad >= self._span[0]
+            and stop + self.pad <= self._span[1]
+        )
+
+    def prefetch(self, start, stop):
+        """
+        Make sure that the ephemeris between *start* and *stop* has
+        been fetched.
+
+        Parameters
+        ----------
+        start : float
+            The start time in seconds from the beginning of the mission.
+        stop : float
+            The stop time in seconds from the beginning of the mission.
+        """
+        import cheta.fetch_sci as fetch
+
+        if self.covers(start, stop):
+            return
+        if self.store is not None and self.store.covers(start, stop):
+            return
+        start = start - self.pad
+        stop = stop + self.pad
+        if self._span is not None:
+            start = min(start, self._span[0])
+            stop = max(stop, self._span[1])
+        mylog.info(
+            "Fetching ephemeris between %s and %s",
+            CxoTime(start).date,
+            CxoTime(stop).date,
+        )
+        self._ephem = fetch.MSIDset(self.msids, start, stop)
+        self._span = (start, stop)
+
+    def get_ephemeris(self, start, stop, times):
+        """
+        Get the orbit and solar ephemeris interpolated to a set of times.
+
+        Parameters
+        ----------
+        start : float
+            The start time of the model run.
+        stop : float
+            The end time of the model run.
+        times : NumPy array
+            The times to interpolate the ephemeris to.
+        """
+        if self.store is not None:
+            if self.store.covers(times[0], times[-1]):
+                return self.store.get_ephemeris(times)
+            mylog.info(
+                "The ephemeris store does not cover %s to %s, fetching from "
+                "the archive instead",
+                CxoTime(times[0]).date,
+                CxoTime(times[-1]).date,
+            )
+        self.prefetch(start, stop)
+        ephem = {}
+        for msid in self.msids:
+            ephem[msid] = ska_numpy.interpolate(
+                self._ephem[msid].vals,
+                self._ephem[msid].times,
+                times,
+            )
+        return ephem
+
+
+def make_ephem_provider(args):
+    """
+    Make an :class:`EphemerisProvider` from the command-line options,
+    using the ephemeris store if one was given.
+
+    Parameters
+    ----------
+    args : ArgumentParser arguments
+        The command-line options object, which has the options
+        attached to it as attributes
+    """
+    store = None
+    ephem_store = getattr(args, "ephem_store", None)
+    if ephem_store is not None:
+        if (Path(ephem_store) / "ephem.json").exists():
+            store = EphemerisStore(ephem_store)
+        else:
+            mylog.warning(
+                "The ephemeris store %s does not exist, fetching the "
+                "ephemeris from the archive instead",
+                ephem_store,
+            )
+    return EphemerisProvider(store=store)
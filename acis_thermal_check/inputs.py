@@ -0,0 +1,344 @@
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import kadi.commands.states as kadi_states
+from cxotime import CxoTime
+
+from acis_thermal_check.cache import get_model_spec
+from acis_thermal_check.ephemeris import make_ephem_provider
+from acis_thermal_check.state_builder import STATE_KEYS
+from acis_thermal_check.utils import make_state_builder, mylog
+
+# Models which can only use the kadi state builder
+kadi_only_models = ["cea"]
+
+
+def needs_hrc_states(model_spec):
+    """
+    Determine whether a model needs HRC states from its
+    model specification.
+
+    Parameters
+    ----------
+    model_spec : dict
+        The model specification.
+    """
+    return any(p["comp_name"] == "215pcast_off" for p in model_spec["pars"])
+
+
+class SharedStateBuilder:
+    """
+    A wrapper around a StateBuilder which is shared between several
+    models, or between the stages of a single model run. The states
+    for a given set of times are only assembled once, with all of the
+    state keys of the StateBuilder, and each model is handed a copy of
+    them reduced to the state keys it needs. All other attributes are
+    those of the wrapped StateBuilder.
+
+    Parameters
+    ----------
+    state_builder : StateBuilder object
+        The StateBuilder which is shared.
+    state_keys : list of strings
+        The state keys which the model using this wrapper needs.
+    states_cache : dict
+        The dictionary which holds the states which have already
+        been assembled, shared between all of the wrappers.
+    """
+
+    def __init__(self, state_builder, state_keys, states_cache):
+        self._state_builder = state_builder
+        self._state_keys = state_keys
+        self._states_cache = states_cache
+
+    def __getattr__(self, attr):
+        return getattr(self._state_builder, attr)
+
+    def _get_states(self, method, *args):
+        key = (method, *args)
+        if key not in self._states_cache:
+            self._states_cache[key] = getattr(self._state_builder, method)(*args)
+        else:
+            mylog.info("Reusing commanded states which were already assembled.")
+        return self._states_cache[key]
+
+    def _select_state_keys(self, states, merge_identical):
+        """
+        Reduce states assembled with all of the state keys of the
+        StateBuilder to those which would have been assembled with
+        the state keys of this model alone. The columns are kept in
+        the same order.
+        """
+        if self._state_keys == self._state_builder.state_keys:
+            return states.copy()
+        reduced = kadi_states.reduce_states(
+            states,
+            self._state_keys,
+            merge_identical=merge_identical,
+        )
+        return reduced[[name for name in states.colnames if name in reduced.colnames]]
+
+    def get_prediction_states(self, tbegin):
+        """
+        Get the states used for the prediction.
+
+        Parameters
+        ----------
+        tbegin : string
+            The starting date/time from which to obtain states for
+            prediction.
+        """
+        states, state0 = self._get_states("get_prediction_states", tbegin)
+        if self._state_keys == self._state_builder.state_keys:
+            return states.copy(), state0.copy()
+        # The prediction states are not merged when they are identical
+        states = self._select_state_keys(states, merge_identical=False)
+        state0 = {key: states[0][key] for key in states.colnames}
+        return states, state0
+
+    def get_validation_states(self, datestart, datestop):
+        """
+        Get states for validation of the thermal model.
+
+        Parameters
+        ----------
+        datestart : string
+            The start date to grab states afterward.
+        datestop : string
+            The end date to grab states before.
+        """
+        states = self._get_states("get_validation_states", datestart, datestop)
+        return self._select_state_keys(states, merge_identical=True)
+
+
+class SharedInputs:
+    """
+    Inputs which are shared between several ACISThermalCheck models
+    run in the same process: the model specifications, the telemetry,
+    the state builders and the states they assemble, and the ephemeris.
+    Each of these is obtained once and then handed to every model which
+    needs it.
+
+    Parameters
+    ----------
+    checks : list of ACISThermalCheck objects
+        The models which share the inputs.
+    args : ArgumentParser arguments
+        The command-line options object, which has the options
+        attached to it as attributes
+    """
+
+    def __init__(self, checks, args):
+        self.checks = checks
+        self.args = args
+        # If no run start time was given, all of the models use the
+        # same "now" so that they share the same telemetry
+        if args.run_start is None:
+            self.run_start = CxoTime().date
+        else:
+            self.run_start = args.run_start
+        self.model_specs = {}
+        for check in checks:
+            mylog.info("Getting model specification for %s", check.name)
+            self.model_specs[check.name] = get_model_spec(
+                check.name,
+                version=getattr(args, "chandra_models_version", None),
+                cache_dir=getattr(args, "cache_dir", None),
+            )
+        self._state_builders = {}
+        self._states_cache = {}
+        self._msidsets = {}
+        self.ephem_provider = make_ephem_provider(args)
+
+    def state_builder_name(self, check):
+        """
+        The name of the state builder used for a model.
+
+        Parameters
+        ----------
+        check : ACISThermalCheck object
+            The model to get the state builder name for.
+        """
+        if check.name in kadi_only_models:
+            return "kadi"
+        return getattr(self.args, "state_builder", "acis")
+
+    def for_load(self, args):
+        """
+        Get a copy of the shared inputs for a different load. The
+        copy shares the model specifications, the telemetry, and the
+        ephemeris with the original, but has its own state builders
+        and states.
+
+        Parameters
+        ----------
+        args : ArgumentParser arguments
+            The command-line options object for the load, which has
+            the options attached to it as attributes
+        """
+        load_inputs = copy.copy(self)
+        load_inputs.args = args
+        load_inputs._state_builders = {}
+        load_inputs._states_cache = {}
+        return load_inputs
+
+    def get_model_spec(self, name):
+        """
+        Get a copy of the model specification for a model, along
+        with the chandra_models version it came from.
+
+        Parameters
+        ----------
+        name : string
+            The name of the model.
+        """
+        model_spec, cm_version = self.model_specs[name]
+        return copy.deepcopy(model_spec), cm_version
+
+    def get_state_builder(self, name, hrc_states=False):
+        """
+        Get the shared state builder of a given type. The state
+        builder is created the first time it is asked for, with
+        HRC states if any of the models which use it need them.
+
+        Parameters
+        ----------
+        name : string
+            The identifier for the state builder to be used.
+        hrc_states : boolean, optional
+            Whether the model asking for the state builder needs
+            HRC-specific states. Default: False
+        """
+        if name not in self._state_builders:
+            any_hrc = any(
+                needs_hrc_states(self.model_specs[check.name][0])
+                for check in self.checks
+                if self.state_builder_name(check) == name
+            )
+            self._state_builders[name] = make_state_builder(
+                name,
+                self.args,
+                hrc_states=any_hrc,
+            )
+        state_builder = self._state_builders[name]
+        if hrc_states:
+            state_keys = state_builder.state_keys
+        else:
+            state_keys = STATE_KEYS.copy()
+        return SharedStateBuilder(state_builder, state_keys, self._states_cache)
+
+    def get_msidset(self, check, tstart, days):
+        """
+        Get the telemetry for a model, interpolated to a common set of
+        times. The telemetry for all of the models is fetched the first
+        time it is asked for, and the telemetry of each model is then
+        interpolated on its own, so that it is the same as if the
+        model had fetched it alone.
+
+        Parameters
+        ----------
+        check : ACISThermalCheck object
+            The model asking for the telemetry.
+        tstart: float
+            Start time for telemetry (secs)
+        days: integer
+            Length of telemetry request before ``tstart`` in days.
+        """
+        key = (tstart, days)
+        if key not in self._msidsets:
+            telem_msids = []
+            for c in self.checks:
+                for msid in c.get_telem_msids()[0]:
+                    if msid not in telem_msids:
+                        telem_msids.append(msid)
+            self._msidsets[key] = check.fetch_telem_msids(
+                telem_msids,
+                tstart,
+                days,
+                interpolate=False,
+            )
+        else:
+            mylog.info("Reusing telemetry from a previous model run.")
+        # Interpolating replaces the times and values of each MSID,
+        # so it is done on copies of them
+        all_msids = self._msidsets[key]
+        msidset = copy.copy(all_msids)
+        msidset.clear()
+        for msid in check.get_telem_msids()[0]:
+            msidset[msid] = copy.copy(all_msids[msid])
+        return check.interpolate_telem_msids(msidset, tstart, days)
+
+
+def run_checks(checks, args, shared_inputs=None):
+    """
+    Run several models in a single process, sharing their inputs.
+    The outputs of each model are written to a subdirectory of
+    ``args.outdir`` with the name of the model.
+
+    Parameters
+    ----------
+    checks : list of ACISThermalCheck objects
+        The models to run.
+    args : ArgumentParser arguments
+        The command-line options object, which has the options
+        attached to it as attributes
+    shared_inputs : :class:`SharedInputs`, optional
+        The inputs to share between the models. Default: None, which
+        means they are made here.
+
+    Returns
+    -------
+    A list of the names of the models which failed.
+    """
+    if shared_inputs is None:
+        shared_inputs = SharedInputs(checks, args)
+    failed = []
+    for check in checks:
+        check_args = copy.copy(args)
+        check_args.outdir = args.outdir / check.name
+        check_args.state_builder = shared_inputs.state_builder_name(check)
+        try:
+            check.run(check_args, shared_inputs=shared_inputs)
+        except Exception as msg:
+            if args.traceback:
+                raise
+            print(f"ERROR in {check.name}_check:", msg)
+            failed.append(check.name)
+    return failed
+
+
+def run_concurrently(tasks):
+    """
+    Run a set of independent tasks concurrently in a pool of threads
+    and wait for all of them to finish. The time taken by each task
+    and by the whole set is logged. If any of the tasks raised an
+    exception, it is raised again once all of them have finished.
+
+    Parameters
+    ----------
+    tasks : dict of callables
+        The tasks to run, keyed by a name used when logging. Each
+        task is called with no arguments.
+
+    Returns
+    -------
+    A dictionary of the values returned by the tasks, with the same keys.
+    """
+
+    def timed(name, task):
+        t0 = time.perf_counter()
+        result = task()
+        mylog.info("Input task '%s' took %.2f s.", name, time.perf_counter() - t0)
+        return result
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        futures = {name: pool.submit(timed, name, task) for name, task in tasks.items()}
+    results = {name: future.result() for name, future in futures.items()}
+    mylog.info(
+        "Input tasks %s took %.2f s in total.",
+        ", ".join(f"'{name}'" for name in tasks),
+        time.perf_counter() - t0,
+    )
+    return results
@@ -1,5 +1,9 @@
+import contextlib
+import copy
 import getpass
+import hashlib
 import json
+import os
 import re
 import shutil
 import time
@@ -9,26 +13,41 @@ from pprint import pformat
 
 import cheta.fetch_sci as fetch
 import matplotlib
-import matplotlib.pyplot as plt
 import numpy as np
 import ska_numpy
-from astropy.io import ascii
 from astropy.table import Table
 from chandra_limits import determine_obsid_info
 from cxotime import CxoTime
 from kadi import events
+from matplotlib.figure import Figure
 from ska_matplotlib import cxctime2plotdate, plot_cxctime, pointpair
-from xija.get_model_spec import get_xija_model_spec
 
 import acis_thermal_check
+from acis_thermal_check.cache import (
+    CachedModel,
+    CheckpointStore,
+    ModelCache,
+    TelemetryCache,
+    get_dahtbon_history,
+    get_model_spec,
+)
+from acis_thermal_check.ephemeris import EphemerisProvider, make_ephem_provider
+from acis_thermal_check.inputs import SharedStateBuilder, run_concurrently
+from acis_thermal_check.sketch import ResidualSketch
 from acis_thermal_check.utils import (
     TASK_DATA,
+    ForkedTask,
     PredictPlot,
+    StateSampler,
+    add_vertical_lines,
     calc_pitch_roll,
+    calc_quantiles,
     config_logging,
+    decimate_minmax,
     make_state_builder,
     mylog,
     paint_perigee,
+    save_figures,
     thermal_blue,
     thermal_red,
 )
@@ -42,9 +61,70 @@ version = acis_thermal_check.__version__
 op_map = {"greater": ">", "greater_equal": ">=", "less": "<", "less_equal": "<="}
 
 
+def strip_figures(plots, *args):
+    """
+    Remove the figure and axes objects from a dictionary of validation
+    plots, leaving the filenames and quantiles, so that it can be sent
+    from a child process back to the parent. Any other arguments are
+    passed through unchanged.
+
+    Parameters
+    ----------
+    plots : dict
+        The validation plots.
+    """
+    stripped = {}
+    for name, plot in plots.items():
+        stripped[name] = {
+            key: {k: v for k, v in val.items() if k not in ["fig", "ax"]}
+            if isinstance(val, dict)
+            else val
+            for key, val in plot.items()
+        }
+    return (stripped, *args)
+
+
 class ACISThermalCheck:
     _limit_class = None
     _flag_cold_viols = False
+    # The models which use the detector housing heater history
+    _heater_models = ["psmc", "acisfp", "cea"]
+    # The number of model templates kept for reuse by calc_model
+    _max_model_templates = 2
+    # The quantiles of the validation residuals, in percent
+    _valid_quantiles = (1, 5, 16, 50, 84, 95, 99)
+    # The style of the prediction plots, and of the validation plots of a
+    # run with a prediction, which is only applied while they are made
+    _plot_style = {
+        "axes.labelsize": 14,
+        "axes.titlesize": 16,
+        "axes.linewidth": 1.5,
+        "xtick.labelsize": 14,
+        "xtick.major.width": 1.5,
+        "xtick.major.size": 4,
+        "xtick.minor.width": 1.5,
+        "xtick.minor.size": 2,
+        "ytick.labelsize": 14,
+        "ytick.major.width": 1.5,
+        "ytick.major.size": 4,
+        "grid.linewidth": 1.5,
+    }
+    # The days of telemetry first fetched for a fast check, which only
+    # needs it to set the initial temperatures of the prediction
+    _fast_check_days = 3.0
+    # The model and data values of the components which are read after
+    # the model has been calculated, and so are kept in the model cache.
+    # The model values of the modeled MSID are always kept.
+    _cached_mvals = ["pitch", "sim_z", "roll"]
+    _cached_dvals = [
+        "roll",
+        "ccd_count",
+        "fep_count",
+        "earthheat__fptemp",
+        "2imonst_on",
+        "2sponst_on",
+        "2s2onst_on",
+    ]
     r"""
     ACISThermalCheck class for making thermal model predictions
     and validating past model data against telemetry
@@ -132,8 +212,46 @@ class ACISThermalCheck:
         self.perigee_passages = defaultdict(list)
         self.write_pickle = False
         self.limits = {}
-
-    def run(self, args, override_limits=None):
+        # The on-disk telemetry cache is only used if a cache
+        # directory is given on the command line
+        self.cache_dir = None
+        self.telem_cache = None
+        # The on-disk cache of model results is only used if it is
+        # asked for on the command line
+        self.model_cache = None
+        # The initial-temperature ensemble is only run if it is
+        # asked for on the command line
+        self.ensemble_size = 0
+        self.ensemble_spread = 1.0
+        self.ensemble_nodes = False
+        self.ensemble = None
+        # Models with their inputs set, kept so that they can be copied
+        # when a model is integrated again over the same window
+        self._model_templates = {}
+        # The offsets of the planning limits for a limit scan, if one
+        # is asked for on the command line
+        self.limit_scan = None
+        # Whether only the prediction is run and checked for violations,
+        # which is asked for on the command line, and the exit status
+        self.fast_check = False
+        self.fast_check_status = None
+        # The number of processes the plots are rendered in
+        self.plot_workers = 1
+        # Whether only the data products are made, without any plots
+        # or web page, which is asked for on the command line
+        self.products_only = False
+        # The validation history and checkpoints are only used if
+        # warm starts are asked for on the command line
+        self.checkpoints = None
+        # Inputs shared with other models run in the same process,
+        # if there are any
+        self.shared_inputs = None
+        # The ephemeris is fetched once for all of the model runs
+        self.ephem_provider = None
+        # Radiation zones which were fetched ahead of time, if any
+        self._rad_zones = None
+
+    def run(self, args, override_limits=None, shared_inputs=None):
         """
         The main interface to all of ACISThermalCheck's functions.
         This method must be called by the particular thermal model
@@ -149,89 +267,141 @@ class ACISThermalCheck:
             in this dictionary. SHOULD ONLY BE USED FOR TESTING.
             This is deliberately hidden from command-line operation
             to avoid it being used accidentally.
+        shared_inputs : :class:`~acis_thermal_check.inputs.SharedInputs`, optional
+            The model specification, telemetry, states, and ephemeris
+            shared with other models which are run in the same process.
+            Default: None, which means this model gets its own inputs.
+
+        Returns
+        -------
+        For a fast check, the exit status: 0 if the prediction does not
+        violate the planning limits, and 2 if it does. Otherwise None.
         """
         if args.version:
             print(f"acis_thermal_check version {version}")
             return
 
-        # First, do some initial setup and log important information.
-
-        proc, model_spec = self._setup_proc_and_logger(args)
-
-        # This allows one to override the limits for a particular model
-        # run. THIS SHOULD ONLY BE USED FOR TESTING PURPOSES.
-        if override_limits is not None:
-            for k, v in override_limits.items():
-                if k in model_spec["limits"][self.msid]:
-                    limit = model_spec["limits"][self.msid][k]
-                    mylog.warning("Replacing %s %.2f with %.2f", k, limit, v)
-                    model_spec["limits"][self.msid][k] = v
-
-        # Set up the limit object and limits
-        self.limit_object = self._limit_class(model_spec=model_spec, margin=0.0)
-        self.limits = self.limit_object.limits
-
-        # Record the selected state builder in the class attributes
-        # If there is no "state_builder" command line argument assume
-        # kadi
-        hrc_states = any(p["comp_name"] == "215pcast_off" for p in model_spec["pars"])
-        state_builder = getattr(args, "state_builder", "kadi")
-        mylog.info(f"ACISThermalCheck is using the '{state_builder}' state builder.")
-        self.state_builder = make_state_builder(
-            state_builder,
+        proc, model_spec, state_builder, hrc_states = self.setup(
             args,
-            hrc_states=hrc_states,
+            override_limits=override_limits,
+            shared_inputs=shared_inputs,
         )
 
+        # A fast check only runs the prediction
+        if self.fast_check:
+            args = copy.copy(args)
+            args.pred_only = True
+
         # If args.run_start is not none, write validation and prediction
         # data to a pickle later
         self.write_pickle = args.run_start is not None
 
+        # Models which share their inputs also share the run start time,
+        # so that they ask for the same telemetry
+        run_start = args.run_start
+        if run_start is None and self.shared_inputs is not None:
+            run_start = self.shared_inputs.run_start
+        is_weekly_load = args.backstop_file is not None
+
+        self.state_builder = self._make_state_builder(
+            args,
+            state_builder,
+            hrc_states,
+        )
+
         # Determine the start and stop times either from whatever was
         # stored in state_builder or punt by using NOW and None for
         # tstart and tstop.
-        is_weekly_load = args.backstop_file is not None
         tstart, tstop, t_run_start = self._determine_times(
-            args.run_start,
+            run_start,
             is_weekly_load,
         )
 
+        if getattr(args, "concurrent_inputs", False):
+            tlm = self._gather_inputs(args, tstart, tstop, t_run_start)
+        else:
+            # Get the telemetry values which will be used
+            # for prediction and validation. Validation runs
+            # begin "args.days" before the start of the prediction
+            # run. "args.days" default value is 21 days.
+            tlm = self._get_run_telem_values(min(tstart, t_run_start), args.days)
+
+            # Fetch the ephemeris for both the validation and the prediction
+            # model runs at once. The prediction starts near the end of the
+            # telemetry and runs until the end of the load.
+            self.ephem_provider.prefetch(*self._input_span(tlm, tstop))
+
         # Store off the start date, and, if you have it, the
         # stop date in proc
         proc["datestart"] = CxoTime(tstart).date
         if tstop is not None:
             proc["datestop"] = CxoTime(tstop).date
 
-        # Get the telemetry values which will be used
-        # for prediction and validation. Validation runs
-        # begin "args.days" before the start of the prediction
-        # run. "args.days" default value is 21 days.
-        tlm = self.get_telem_values(min(tstart, t_run_start), days=args.days)
+        # Read the heater history before the validation is forked,
+        # so that it is shared by the validation and the prediction
+        if self.name in self._heater_models:
+            self.get_heater_history()
+
+        # The validation can run in a forked process while the
+        # prediction runs in this one
+        validation = None
+        if (
+            getattr(args, "parallel_branches", False)
+            and args.backstop_file is not None
+            and not args.pred_only
+        ):
+            mylog.info("Running the model validation in a separate process.")
+            validation = ForkedTask(
+                lambda: strip_figures(
+                    *self.run_validation(
+                        tlm,
+                        model_spec,
+                        args.outdir,
+                        styled=True,
+                    ),
+                ),
+            )
 
         # make predictions on a backstop file if defined
         if args.backstop_file is not None:
-            pred = self.make_week_predict(
-                tstart,
-                tstop,
-                tlm,
-                args.T_init,
-                model_spec,
-                args.outdir,
-            )
+            try:
+                pred = self.make_week_predict(
+                    tstart,
+                    tstop,
+                    tlm,
+                    args.T_init,
+                    model_spec,
+                    args.outdir,
+                )
+            except Exception:
+                if validation is not None:
+                    validation.cancel()
+                raise
             mylog.info("Model prediction complete.")
         else:
             pred = defaultdict(lambda: None)
             mylog.info("No model prediction run.")
 
+        # A fast check stops here, without any plots or web page
+        if self.fast_check:
+            return self.write_fast_check(args.outdir, pred, tstart, tstop)
+
         # Validation
         if not args.pred_only:
-            # Make the validation plots
-            plots_validation = self.make_validation_plots(tlm, model_spec, args.outdir)
+            # Make the validation plots and determine violations
+            # of temperature validation
+            if validation is None:
+                plots_validation, valid_viols = self.run_validation(
+                    tlm,
+                    model_spec,
+                    args.outdir,
+                    styled=args.backstop_file is not None,
+                )
+            else:
+                plots_validation, valid_viols = validation.result()
 
             proc["op"] = [op_map[op] for op in self.hist_ops]
 
-            # Determine violations of temperature validation
-            valid_viols = self.make_validation_viols(plots_validation)
             if len(valid_viols) > 0:
                 mylog.warning("validation warning(s) in output at %s" % args.outdir)
             mylog.info("Model validation complete.")
@@ -240,6 +410,11 @@ class ACISThermalCheck:
             plots_validation = defaultdict(lambda: None)
             mylog.info("No model validation run.")
 
+        # Only the data products and the violations are written
+        if self.products_only:
+            self.write_viols(args.outdir, proc, pred["viols"], valid_viols)
+            return
+
         if pred["viols"] is not None:
             any_viols = sum(len(viol) for viol in pred["viols"].values())
         else:
@@ -258,6 +433,8 @@ class ACISThermalCheck:
             "proc": proc,
             "pred_only": args.pred_only,
             "plots_validation": plots_validation,
+            "ensemble": pred["ensemble"],
+            "limit_scan": pred["limit_scan"],
         }
 
         self.write_index_rst(args.outdir, context)
@@ -267,14 +444,325 @@ class ACISThermalCheck:
 
         return
 
+    def setup(self, args, override_limits=None, shared_inputs=None):
+        """
+        Set up this model for a run from the command-line options: get
+        the model specification, set up the logger, the limits, and the
+        caches, and record the options which control the run.
+
+        Parameters
+        ----------
+        args : ArgumentParser arguments
+            The command-line options object, which has the options
+            attached to it as attributes
+        override_limits : dict, optional
+            Override any limit by setting a new value to its name
+            in this dictionary. SHOULD ONLY BE USED FOR TESTING.
+        shared_inputs : :class:`~acis_thermal_check.inputs.SharedInputs`, optional
+            The model specification, telemetry, states, and ephemeris
+            shared with other models which are run in the same process.
+            Default: None, which means this model gets its own inputs.
+
+        Returns
+        -------
+        The processing information, the model specification, the name
+        of the state builder to use, and whether HRC states are needed.
+        """
+        self.shared_inputs = shared_inputs
+        if self.shared_inputs is not None:
+            self.ephem_provider = self.shared_inputs.ephem_provider
+        else:
+            self.ephem_provider = make_ephem_provider(args)
+
+        # First, do some initial setup and log important information.
+
+        proc, model_spec = self._setup_proc_and_logger(args)
+
+        # This allows one to override the limits for a particular model
+        # run. THIS SHOULD ONLY BE USED FOR TESTING PURPOSES.
+        if override_limits is not None:
+            for k, v in override_limits.items():
+                if k in model_spec["limits"][self.msid]:
+                    limit = model_spec["limits"][self.msid][k]
+                    mylog.warning("Replacing %s %.2f with %.2f", k, limit, v)
+                    model_spec["limits"][self.msid][k] = v
+
+        # Set up the limit object and limits
+        self.limit_object = self._limit_class(model_spec=model_spec, margin=0.0)
+        self.limits = self.limit_object.limits
+
+        # Record the selected state builder in the class attributes
+        # If there is no "state_builder" command line argument assume
+        # kadi
+        hrc_states = any(p["comp_name"] == "215pcast_off" for p in model_spec["pars"])
+        state_builder = getattr(args, "state_builder", "kadi")
+        mylog.info(f"ACISThermalCheck is using the '{state_builder}' state builder.")
+
+        # Use a local cache of telemetry if a cache directory was given
+        cache_dir = getattr(args, "cache_dir", None)
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            self.telem_cache = TelemetryCache(cache_dir)
+        if getattr(args, "model_cache", False):
+            if cache_dir is None:
+                raise RuntimeError("--model-cache requires --cache-dir to be set!")
+            self.model_cache = ModelCache(cache_dir)
+        if getattr(args, "warm_start", False):
+            if cache_dir is None:
+                raise RuntimeError("--warm-start requires --cache-dir to be set!")
+            self.checkpoints = CheckpointStore(
+                cache_dir,
+                self.name,
+                self._model_key(model_spec),
+            )
+
+        self.ensemble_size = getattr(args, "ensemble", 0)
+        if self.ensemble_size == 1:
+            raise RuntimeError("--ensemble must be at least 2!")
+        self.ensemble_spread = getattr(args, "ensemble_spread", 1.0)
+        self.ensemble_nodes = getattr(args, "ensemble_nodes", False)
+        self.limit_scan = getattr(args, "limit_scan", None)
+        self.fast_check = getattr(args, "fast_check", False)
+        self.plot_workers = getattr(args, "plot_workers", 1)
+        self.products_only = getattr(args, "products_only", False)
+        if self.fast_check and args.backstop_file is None:
+            raise RuntimeError("--fast-check requires a backstop file!")
+
+        return proc, model_spec, state_builder, hrc_states
+
+    def run_validation(self, tlm, model_spec, outdir, styled=False):
+        """
+        Run the model validation: make the validation plots and
+        quantile table, and determine the validation violations.
+
+        Parameters
+        ----------
+        tlm : NumPy record array
+            NumPy record array of telemetry
+        model_spec : string
+            The path to the thermal model specification.
+        outdir : Path
+            The directory to write outputs to.
+        styled : boolean, optional
+            Whether the plots are made with the style of the prediction
+            plots, which they have always had when a prediction was
+            run before them. Default: False
+
+        Returns
+        -------
+        The validation plots and the validation violations.
+        """
+        style = contextlib.nullcontext()
+        if styled:
+            style = matplotlib.rc_context(self._plot_style)
+        with style:
+            plots_validation = self.make_validation_plots(tlm, model_spec, outdir)
+        valid_viols = self.make_validation_viols(plots_validation)
+        return plots_validation, valid_viols
+
+    def _make_state_builder(self, args, state_builder, hrc_states):
+        """
+        Make the state builder for this model, or get the one shared
+        with other models.
+
+        Parameters
+        ----------
+        args : ArgumentParser arguments
+            The command-line options object, which has the options
+            attached to it as attributes
+        state_builder : string
+            The identifier for the state builder to be used.
+        hrc_states : boolean
+            Whether to add HRC-specific states.
+        """
+        if self.shared_inputs is not None:
+            return self.shared_inputs.get_state_builder(
+                state_builder,
+                hrc_states=hrc_states,
+            )
+        return make_state_builder(state_builder, args, hrc_states=hrc_states)
+
+    def _input_span(self, tlm, tstop):
+        """
+        The span of time covered by the validation and prediction model
+        runs, which is from the beginning of the telemetry to the end of
+        the telemetry or the end of the load, whichever is later.
+
+        Parameters
+        ----------
+        tlm : NumPy structured array
+            The telemetry used for the model runs.
+        tstop : float
+            The stop time of the load, or None if there is no load.
+        """
+        stop = tlm["date"][-1]
+        if tstop is not None:
+            stop = max(stop, tstop)
+        return tlm["date"][0], stop
+
+    def _gather_inputs(self, args, tstart, tstop, t_run_start):
+        """
+        Gather the inputs to the model runs with independent tasks run
+        concurrently, rather than one after the other.
+
+        The telemetry is fetched up to the start of the load or the run
+        start time, whichever is earlier, and the commanded states for
+        both the prediction and validation are then assembled from it.
+        At the same time, the ephemeris and the radiation zones for the
+        span of the telemetry and the load are obtained. The states,
+        ephemeris, and radiation zones are reused when the model runs
+        ask for them.
+
+        Parameters
+        ----------
+        args : ArgumentParser arguments
+            The command-line options object, which has the options
+            attached to it as attributes
+        tstart : float
+            The start time of the load, or the run start time if there
+            is no load.
+        tstop : float
+            The stop time of the load, or None if there is no load.
+        t_run_start : float
+            The run start time.
+
+        Returns
+        -------
+        The telemetry.
+        """
+        is_weekly_load = args.backstop_file is not None
+        t_tlm = min(tstart, t_run_start)
+
+        # The states are assembled through a wrapper which keeps them,
+        # so that the model runs reuse the ones assembled here. Shared
+        # state builders already do this.
+        if self.shared_inputs is None:
+            self.state_builder = SharedStateBuilder(
+                self.state_builder,
+                self.state_builder.state_keys,
+                {},
+            )
+
+        def get_telem_and_states():
+            tlm = self._get_run_telem_values(t_tlm, args.days)
+            # kadi toggles global state while assembling states, so
+            # the prediction and validation states are assembled one
+            # after the other in the same task
+            if is_weekly_load:
+                tbegin = CxoTime(tlm["date"][-5]).date
+                self.state_builder.get_prediction_states(tbegin)
+            if not args.pred_only:
+                self.state_builder.get_validation_states(
+                    tlm["date"][0],
+                    tlm["date"][-1],
+                )
+            return tlm
+
+        # The telemetry is not known yet, so the ephemeris and radiation
+        # zones are obtained for the span of telemetry which is asked for,
+        # which covers the telemetry which is found. A fast check which
+        # finds no telemetry in its shorter span gets the rest on demand.
+        days = args.days
+        if self.fast_check:
+            days = min(days, self._fast_check_days)
+        span = (t_tlm - days * 86400.0, t_tlm)
+        if tstop is not None:
+            span = (span[0], max(span[1], tstop))
+        tasks = {
+            "telemetry and states": get_telem_and_states,
+            "ephemeris": lambda: self.ephem_provider.prefetch(*span),
+        }
+        # The prediction plots show the radiation zones up to a
+        # day after the start of the load, and there are no plots for
+        # a fast check or when only the data products are made
+        if not (self.fast_check or self.products_only):
+            tasks["radiation zones"] = lambda: self.prefetch_rad_zones(
+                span[0] - 86400.0,
+                max(span[1], tstart) + 2.0 * 86400.0,
+            )
+        results = run_concurrently(tasks)
+
+        return results["telemetry and states"]
+
+    def _get_run_telem_values(self, tstart, days):
+        """
+        Fetch the telemetry for the model runs. A fast check only needs
+        the telemetry just before the start of the load, so it first
+        asks for a few days of it, and only asks for all ``days`` of it
+        if there is none in those few days, e.g. after a long comm gap.
+
+        Parameters
+        ----------
+        tstart: float
+            Start time for telemetry (secs)
+        days: integer
+            Length of telemetry request before ``tstart`` in days.
+        """
+        if self.fast_check and days > self._fast_check_days:
+            try:
+                return self.get_telem_values(tstart, days=self._fast_check_days)
+            except ValueError:
+                mylog.info(
+                    "Found no telemetry within %g days for the fast check, "
+                    "fetching %g days of telemetry.",
+                    self._fast_check_days,
+                    days,
+                )
+        return self.get_telem_values(tstart, days=days)
+
+    def prefetch_rad_zones(self, start, stop):
+        """
+        Get the radiation zones between *start* and *stop* from kadi
+        and keep them, so that later requests for radiation zones
+        within that span are served from them.
+
+        Parameters
+        ----------
+        start : float
+            The start time in seconds from the beginning of the mission.
+        stop : float
+            The stop time in seconds from the beginning of the mission.
+        """
+        rzs = list(events.rad_zones.filter(start, stop))
+        self._rad_zones = ((start, stop), rzs)
+
+    def get_rad_zones(self, start, stop):
+        """
+        Get the radiation zones which overlap the times between
+        *start* and *stop*.
+
+        Parameters
+        ----------
+        start : float
+            The start time in seconds from the beginning of the mission.
+        stop : float
+            The stop time in seconds from the beginning of the mission.
+        """
+        if self._rad_zones is not None:
+            (span_start, span_stop), rzs = self._rad_zones
+            tstart = CxoTime(start).secs
+            tstop = CxoTime(stop).secs
+            if span_start <= tstart and tstop <= span_stop:
+                return [rz for rz in rzs if rz.tstart <= tstop and rz.tstop > tstart]
+        return events.rad_zones.filter(start, stop)
+
     def get_ephemeris(self, start, stop, times):
-        msids = [f"orbitephem0_{axis}" for axis in "xyz"]
-        msids += [f"solarephem0_{axis}" for axis in "xyz"]
-        e = fetch.MSIDset(msids, start - 2000.0, stop + 2000.0)
-        ephem = {}
-        for msid in msids:
-            ephem[msid] = ska_numpy.interpolate(e[msid].vals, e[msid].times, times)
-        return ephem
+        """
+        Get the orbit and solar ephemeris interpolated to the
+        times of a model run.
+
+        Parameters
+        ----------
+        start : float
+            The start time of the model run.
+        stop : float
+            The end time of the model run.
+        times : NumPy array
+            The times of the model run.
+        """
+        if self.ephem_provider is None:
+            self.ephem_provider = EphemerisProvider()
+        return self.ephem_provider.get_ephemeris(start, stop, times)
 
     def get_states(self, tlm, T_init):
         """
@@ -348,37 +836,69 @@ class ACISThermalCheck:
 
         # calc_model actually does the model calculation by running
         # model-specific code.
+        # The members of an ensemble reuse the inputs of this model
         model = self.calc_model(
             model_spec,
             states,
             state0["tstart"],
             tstop,
             state0=state0,
+            reuse=self.ensemble_size > 0,
         )
 
         self.predict_model = model
 
         # Make the limit check plots and data files
-        plt.rc("axes", labelsize=14, titlesize=16, linewidth=1.5)
-        plt.rc("xtick", labelsize=14)
-        plt.rc("xtick.major", width=1.5, size=4)
-        plt.rc("xtick.minor", width=1.5, size=2)
-        plt.rc("ytick", labelsize=14)
-        plt.rc("ytick.major", width=1.5, size=4)
-        plt.rc("grid", linewidth=1.5)
-
         temps = {self.name: model.comp[self.msid].mvals}
 
         # make_prediction_viols determines the violations and prints them out
         viols, upper_limit, lower_limit = self.make_prediction_viols(
             temps, states, tstart
         )
+        self.predict_viols = viols
+
+        # A fast check only needs the violations
+        if self.fast_check:
+            return {
+                "states": states,
+                "times": model.times,
+                "temps": temps,
+                "plots": None,
+                "viols": viols,
+                "ensemble": None,
+                "limit_scan": None,
+            }
+
+        # Check the violations of the prediction for a range of
+        # offsets of the planning limits, if asked for
+        limit_scan = None
+        if self.limit_scan is not None:
+            limit_scan = self.scan_limits(model_spec, states, tstart, self.limit_scan)
+            self.write_limit_scan(outdir, limit_scan)
+
+        # Run the ensemble of models with perturbed initial temperatures,
+        # if asked for, so that its envelope can be drawn on the plots
+        if self.ensemble_size > 0:
+            self.ensemble = self.run_ensemble(
+                model_spec,
+                states,
+                state0,
+                tstop,
+                tstart,
+                upper_limit,
+                lower_limit,
+            )
+            self.write_ensemble(outdir, self.ensemble)
 
         # make_prediction_plots runs the validation of the model
         # against previous telemetry
-        plots = self.make_prediction_plots(
-            outdir, states, temps, tstart, upper_limit, lower_limit
-        )
+        if self.products_only:
+            plots = None
+        else:
+            with matplotlib.rc_context(self._plot_style):
+                plots = self.make_prediction_plots(
+                    outdir, states, temps, tstart, upper_limit, lower_limit
+                )
 
         # write_states writes the commanded states to states.dat
         self.write_states(outdir, states)
@@ -392,12 +912,496 @@ class ACISThermalCheck:
             "temps": temps,
             "plots": plots,
             "viols": viols,
+            "ensemble": self.ensemble,
+            "limit_scan": limit_scan,
+        }
+
+    def write_fast_check(self, outdir, pred, load_start, load_stop):
+        """
+        Summarize the violations of the planning limits by the prediction
+        for a fast check. The summary is printed as a single line of JSON
+        and written to the file "fast_check.json".
+
+        Parameters
+        ----------
+        outdir : Path
+            The directory the file will be written to.
+        pred : dict
+            The prediction, as returned by :meth:`make_week_predict`.
+        load_start : float
+            The start time of the load in seconds from the beginning
+            of the mission.
+        load_stop : float
+            The stop time of the load in seconds from the beginning
+            of the mission.
+
+        Returns
+        -------
+        The exit status: 0 if the prediction does not violate the
+        planning limits, and 2 if it does.
+        """
+        times = pred["times"]
+        temps = pred["temps"][self.name][times >= load_start]
+        viols = self._viols_to_json(pred["viols"])
+        any_viols = any(len(key_viols) > 0 for key_viols in viols.values())
+        summary = {
+            "model": self.name,
+            "msid": self.msid,
+            "load": str(self.bsdir),
+            "datestart": CxoTime(load_start).date,
+            "datestop": CxoTime(load_stop).date,
+            "max_temp": float(temps.max()),
+            "min_temp": float(temps.min()),
+            "status": "FAIL" if any_viols else "PASS",
+            "viols": viols,
+        }
+        outfile = outdir / "fast_check.json"
+        mylog.info("Writing fast check summary to %s" % outfile)
+        with open(outfile, "w") as f:
+            json.dump(summary, f, indent=4)
+        print(json.dumps(summary))
+        self.fast_check_status = 2 if any_viols else 0
+        return self.fast_check_status
+
+    def _viols_to_json(self, viols):
+        # Convert the violations of the planning limits to lists of
+        # dictionaries of plain Python values, so that they can be
+        # written out as JSON
+        keys = ["datestart", "datestop", "duration", "extemp", "limit"]
+        if self.msid == "fptemp":
+            keys += ["obsid", "exp_time"]
+        return {
+            which: [
+                {
+                    key: viol[key].item()
+                    if isinstance(viol[key], np.generic)
+                    else viol[key]
+                    for key in keys
+                    if key in viol
+                }
+                for viol in which_viols
+            ]
+            for which, which_viols in viols.items()
+        }
+
+    def write_viols(self, outdir, proc, viols, valid_viols):
+        """
+        Write the violations of the planning limits by the prediction and
+        of the validation limits to the file "violations.json".
+
+        Parameters
+        ----------
+        outdir : Path
+            The directory the file will be written to.
+        proc : dict
+            The processing information.
+        viols : dict or None
+            The violations of the planning limits, or None if no
+            prediction was run.
+        valid_viols : list or defaultdict
+            The violations of the validation limits. This is a
+            defaultdict if no validation was run.
+        """
+        if viols is not None:
+            viols = self._viols_to_json(viols)
+        if not isinstance(valid_viols, list):
+            valid_viols = None
+        out = {
+            "model": self.name,
+            "msid": self.msid,
+            "load": None if self.bsdir is None else str(self.bsdir),
+            "datestart": proc["datestart"],
+            "datestop": proc.get("datestop"),
+            "prediction": viols,
+            "validation": valid_viols,
+        }
+        outfile = outdir / "violations.json"
+        mylog.info("Writing violations to %s" % outfile)
+        with open(outfile, "w") as f:
+            json.dump(out, f, indent=4)
+
+    def run_ensemble(
+        self, model_spec, states, state0, tstop, load_start, upper_limit, lower_limit
+    ):
+        """
+        Run an ensemble of prediction models whose initial temperatures
+        are offset from that of the prediction by evenly spaced amounts
+        between -spread and +spread. The pseudo-nodes coupled to the
+        modeled MSID follow its initial temperature, as they do for
+        the prediction. If ``self.ensemble_nodes`` is True, each of the
+        pseudo-nodes is also given a random offset within the spread.
+        The members of the ensemble are run in parallel in forked
+        processes.
+
+        Parameters
+        ----------
+        model_spec : dict
+            The model specification.
+        states : NumPy record array
+            Commanded states
+        state0 : dict
+            The initial state of the prediction.
+        tstop : float
+            The end time of the model run.
+        load_start : float
+            The start time of the load, used so that we only report
+            violations for times later than this time for the model
+            run.
+        upper_limit : LimitLine object
+            The upper planning limit.
+        lower_limit : LimitLine object or None
+            The lower planning limit, if violations of it are flagged.
+
+        Returns
+        -------
+        A dictionary with the initial temperatures, maximum temperatures,
+        and violations of each member, and the envelope of the predicted
+        temperatures of all of the members and the prediction.
+        """
+        n = self.ensemble_size
+        spread = self.ensemble_spread
+        T_inits = state0[self.msid] + np.linspace(-spread, spread, n)
+
+        # Initial temperatures of the pseudo-nodes in the prediction,
+        # which are only known if the model was actually run
+        comps = getattr(self.predict_model, "comps", [])
+        nodes = {
+            comp.name: comp.mvals[0]
+            for comp in comps
+            if getattr(comp, "predict", False) and comp.name != self.msid
+        }
+        if self.ensemble_nodes and len(nodes) == 0:
+            mylog.warning("No pseudo-node temperatures to perturb in the ensemble.")
+        rng = np.random.default_rng(0)
+        node_offsets = rng.uniform(-spread, spread, size=(n, len(nodes)))
+
+        def run_member(i):
+            member_state0 = state0.copy()
+            member_state0[self.msid] = T_inits[i]
+            node_init = None
+            if self.ensemble_nodes and len(nodes) > 0:
+                node_init = {
+                    node: value + (T_inits[i] - state0[self.msid]) + node_offsets[i, j]
+                    for j, (node, value) in enumerate(nodes.items())
+                }
+            model = self.calc_model(
+                model_spec,
+                states,
+                state0["tstart"],
+                tstop,
+                state0=member_state0,
+                node_init=node_init,
+            )
+            viols = {
+                "hi": upper_limit.check_violations(model, start_time=load_start),
+            }
+            if lower_limit is not None:
+                viols["lo"] = lower_limit.check_violations(
+                    model,
+                    start_time=load_start,
+                )
+            return model.comp[self.msid].mvals, viols
+
+        mylog.info(
+            "Running an ensemble of %d %s models with initial temperatures "
+            "from %.2f to %.2f C",
+            n,
+            self.name.upper(),
+            T_inits[0],
+            T_inits[-1],
+        )
+        results = []
+        workers = os.cpu_count() or 1
+        for i0 in range(0, n, workers):
+            tasks = [ForkedTask(run_member, i) for i in range(i0, min(i0 + workers, n))]
+            try:
+                results += [task.result() for task in tasks]
+            except Exception:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+        times = self.predict_model.times
+        after = times >= load_start
+        all_temps = np.vstack(
+            [self.predict_model.comp[self.msid].mvals] + [r[0] for r in results],
+        )
+        members = []
+        for T_init, (temps, viols) in zip(T_inits, results, strict=True):
+            all_viols = [viol for key in viols for viol in viols[key]]
+            members.append(
+                {
+                    "T_init": T_init,
+                    "max_temp": temps[after].max() if after.any() else temps.max(),
+                    "min_temp": temps[after].min() if after.any() else temps.min(),
+                    "num_viols": len(all_viols),
+                    "duration": sum(viol["duration"] for viol in all_viols),
+                    "first_viol": min(
+                        (viol["datestart"] for viol in all_viols),
+                        default="N/A",
+                    ),
+                    "viols": viols,
+                },
+            )
+        return {
+            "times": times,
+            "min": all_temps.min(axis=0),
+            "max": all_temps.max(axis=0),
+            "spread": spread,
+            "nodes": self.ensemble_nodes and len(nodes) > 0,
+            "members": members,
         }
 
-    def _calc_model_supp(self, model, state_times, states, ephem, state0):
+    def scan_limits(self, model_spec, states, load_start, offsets):
+        """
+        Check the violations of the prediction for a range of offsets of
+        the planning limits, without running the model again. For each
+        offset, the upper planning limits are raised and the lower
+        planning limits are lowered by the offset, so that negative
+        offsets tighten the limits.
+
+        Parameters
+        ----------
+        model_spec : dict
+            The model specification.
+        states : NumPy record array
+            Commanded states
+        load_start : float
+            The start time of the load, used so that we only report
+            violations for times later than this time for the model
+            run.
+        offsets : list of floats
+            The offsets of the planning limits in degrees C.
+
+        Returns
+        -------
+        A list with the number and total duration of the violations of
+        the upper (and, if flagged, lower) planning limits for each offset.
+        """
+        mylog.info("Scanning planning limit offsets %s", offsets)
+        if self.msid == "fptemp":
+            obs_list = determine_obsid_info(states)
+        scan = []
+        for offset in offsets:
+            spec = copy.deepcopy(model_spec)
+            limits = spec["limits"][self.msid]
+            for key in limits:
+                if not key.startswith("planning"):
+                    continue
+                if ".high" in key:
+                    limits[key] += offset
+                elif ".low" in key:
+                    limits[key] -= offset
+            limit_object = self._limit_class(model_spec=spec, margin=0.0)
+            if self.msid == "fptemp":
+                limit_object.set_obs_info(obs_list)
+            whiches = ["high", "low"] if self._flag_cold_viols else ["high"]
+            row = {"offset": offset}
+            for which in whiches:
+                limit_line = limit_object.get_limit_line(states, which=which)
+                viols = limit_line.check_violations(
+                    self.predict_model,
+                    start_time=load_start,
+                )
+                row[f"{which}_viols"] = len(viols)
+                row[f"{which}_duration"] = sum(viol["duration"] for viol in viols)
+            scan.append(row)
+        return scan
+
+    def write_limit_scan(self, outdir, limit_scan):
+        """
+        Write the results of a limit scan to the file "limit_scan.csv".
+
+        Parameters
+        ----------
+        outdir : Path
+            The directory the file will be written to.
+        limit_scan : list of dicts
+            The limit scan, as returned by :meth:`scan_limits`.
+        """
+        outfile = outdir / "limit_scan.csv"
+        mylog.info("Writing limit scan to %s" % outfile)
+        names = list(limit_scan[0])
+        scan_table = Table(
+            rows=[[row[name] for name in names] for row in limit_scan],
+            names=names,
+        )
+        for name in names:
+            if name == "offset" or name.endswith("duration"):
+                scan_table[name].format = "%.2f"
+        scan_table.write(outfile, format="ascii.csv", overwrite=True)
+
+    def write_ensemble(self, outdir, ensemble):
+        """
+        Write the envelope of the predicted temperatures of the ensemble
+        to the file "ensemble.dat", and a summary of its members to the
+        file "ensemble_members.dat".
+
+        Parameters
+        ----------
+        outdir : Path
+            The directory the files will be written to.
+        ensemble : dict
+            The ensemble, as returned by :meth:`run_ensemble`.
+        """
+        outfile = outdir / "ensemble.dat"
+        mylog.debug("Writing ensemble envelope to %s" % outfile)
+        times = ensemble["times"]
+        env_table = Table(
+            [times, CxoTime(times).date, ensemble["min"], ensemble["max"]],
+            names=["time", "date", f"{self.msid}_min", f"{self.msid}_max"],
+            copy=False,
+        )
+        env_table["time"].format = "%.2f"
+        env_table[f"{self.msid}_min"].format = "%.2f"
+        env_table[f"{self.msid}_max"].format = "%.2f"
+        env_table.write(outfile, format="ascii", delimiter="\t", overwrite=True)
+
+        outfile = outdir / "ensemble_members.dat"
+        mylog.debug("Writing ensemble members to %s" % outfile)
+        names = [
+            "T_init",
+            "max_temp",
+            "min_temp",
+            "num_viols",
+            "duration",
+            "first_viol",
+        ]
+        member_table = Table(
+            rows=[[m[name] for name in names] for m in ensemble["members"]],
+            names=names,
+        )
+        for name in ["T_init", "max_temp", "min_temp", "duration"]:
+            member_table[name].format = "%.2f"
+        member_table.write(outfile, format="ascii", delimiter="\t", overwrite=True)
+
+    def _plot_ensemble(self, plot):
+        """
+        Draw the envelope of the predicted temperatures of the
+        ensemble, if there is one, on a temperature plot.
+
+        Parameters
+        ----------
+        plot : PredictPlot object
+            The temperature plot.
+        """
+        if self.ensemble is None:
+            return
+        plot.ax.fill_between(
+            cxctime2plotdate(self.ensemble["times"]),
+            self.ensemble["min"],
+            self.ensemble["max"],
+            color=thermal_blue,
+            alpha=0.3,
+            linewidth=0,
+            zorder=9,
+            label="Ensemble",
+        )
+
+    def _calc_model_supp(self, model, sampler, states, ephem, state0):
         pass
 
-    def calc_model(self, model_spec, states, tstart, tstop, state0=None):
+    def _model_key(self, model_spec):
+        """
+        Make a key which identifies this model, from a hash of its
+        model specification, its class, and the software versions.
+
+        Parameters
+        ----------
+        model_spec : dict
+            The model specification.
+        """
+        import xija
+
+        h = hashlib.sha256()
+        h.update(json.dumps(model_spec, sort_keys=True).encode())
+        for item in (type(self).__name__, version, xija.__version__):
+            h.update(item.encode())
+        return h.hexdigest()
+
+    def calc_validation_model(self, model_spec, states, tstart, tstop):
+        """
+        Run the model for validation. If warm starts are enabled, the
+        model is run from the latest checkpoint of the validation
+        history which it can resume from, and the stored history is
+        stitched in before it. The validation history and checkpoints
+        are then updated with the new model run.
+
+        Parameters
+        ----------
+        model_spec : dict
+            The model specification.
+        states : NumPy record array
+            Commanded states
+        tstart : float
+            The start time of the validation.
+        tstop : float
+            The stop time of the validation.
+        """
+        if self.checkpoints is None:
+            return self.calc_model(model_spec, states, tstart, tstop)
+
+        checkpoint = self.checkpoints.latest_checkpoint(tstart, tstop)
+        if checkpoint is None:
+            mylog.info(
+                "No checkpoint to resume the %s model validation from, "
+                "running the full validation interval",
+                self.name.upper(),
+            )
+            model = self.calc_model(model_spec, states, tstart, tstop)
+        else:
+            t_ckpt, node_init = checkpoint
+            mylog.info(
+                "Resuming %s model validation from the checkpoint at %s",
+                self.name.upper(),
+                CxoTime(t_ckpt).date,
+            )
+            model = self.calc_model(
+                model_spec,
+                states,
+                t_ckpt,
+                tstop,
+                node_init=node_init,
+            )
+
+        # Results from the model cache do not have the temperatures of
+        # all of the nodes, but they were stored when the model was run
+        if not isinstance(model, CachedModel):
+            nodes = {
+                comp.name: comp.mvals
+                for comp in model.comps
+                if getattr(comp, "predict", False)
+            }
+            self.checkpoints.update(
+                model,
+                [self.msid] + self._cached_mvals,
+                self._cached_dvals,
+                nodes,
+            )
+
+        if checkpoint is not None:
+            model = self.checkpoints.stitch(model, tstart)
+
+        return model
+
+    def get_heater_history(self):
+        """
+        Get the history of the detector housing heater state, which is
+        only read from disk once per process.
+        """
+        htrbfn = TASK_DATA / "acis_thermal_check/data/dahtbon_history.rdb"
+        return get_dahtbon_history(htrbfn, cache_dir=self.cache_dir)
+
+    def calc_model(
+        self,
+        model_spec,
+        states,
+        tstart,
+        tstop,
+        state0=None,
+        node_init=None,
+        reuse=False,
+    ):
         """
         This method sets up the model and runs it. "make_model" is
         provided by the specific model instances.
@@ -416,43 +1420,189 @@ class ACISThermalCheck:
             This is used to set the initial temperature. It's a dictionary
             indexed by MSID name so that more than one can be input if
             necessary.
+        node_init : dict, optional
+            Initial temperatures of model nodes (including pseudo-nodes)
+            indexed by node name, which override any others. This is used
+            to resume a model run from a checkpoint.
+        reuse : boolean, optional
+            Whether the model will be integrated again over the same
+            window with the same states, e.g. for the members of an
+            ensemble. If so, a copy of the model with its inputs set is
+            kept as a template for the later model runs. Default: False
         """
         import xija
 
-        model = xija.ThermalModel(
-            self.name,
-            start=tstart,
-            stop=tstop,
-            model_spec=model_spec,
-        )
-        ephem = self.get_ephemeris(tstart, tstop, model.times)
-        state_times = np.array([states["tstart"], states["tstop"]])
-        model.comp["sim_z"].set_data(states["simpos"], state_times)
-        model.comp["eclipse"].set_data(states["eclipse"] != "DAY", state_times)
-        for name in ("ccd_count", "fep_count", "vid_board", "clocking"):
-            model.comp[name].set_data(states[name], state_times)
-        pitch, roll = calc_pitch_roll(model.times, ephem, states)
-        model.comp["roll"].set_data(roll, model.times)
-        model.comp["pitch"].set_data(pitch, model.times)
-
-        if self.name in ["psmc", "acisfp", "cea"] and state0 is not None:
-            # Detector housing heater contribution to heating
-            htrbfn = TASK_DATA / "acis_thermal_check/data/dahtbon_history.rdb"
-            mylog.info("Reading file of dahtrb commands from file %s" % htrbfn)
-            htrb = ascii.read(htrbfn, format="rdb")
-            dh_heater_times = CxoTime(htrb["time"]).secs
-            dh_heater = htrb["dahtbon"].astype(bool)
-            model.comp["dh_heater"].set_data(dh_heater, dh_heater_times)
+        # A model which is integrated again over the same window with the
+        # same states is copied from a template which already has all of
+        # the inputs that do not depend on the initial temperatures
+        template_key = template = None
+        if reuse or self._model_templates:
+            h = hashlib.sha256()
+            for colname in sorted(states.dtype.names):
+                h.update(colname.encode())
+                h.update(np.ascontiguousarray(states[colname]).tobytes())
+            template_key = (
+                self._model_key(model_spec),
+                tstart,
+                tstop,
+                h.hexdigest(),
+                state0 is not None,
+            )
+            template = self._model_templates.get(template_key)
+        if template is None:
+            model = xija.ThermalModel(
+                self.name,
+                start=tstart,
+                stop=tstop,
+                model_spec=model_spec,
+            )
+            ephem = self.get_ephemeris(tstart, tstop, model.times)
+
+            # The states are sampled onto the model times once, and every
+            # state input of the model uses the same sampling
+            sampler = StateSampler(states, model.times)
+            sampler.set_data(model.comp["sim_z"], states["simpos"])
+            sampler.set_data(model.comp["eclipse"], states["eclipse"] != "DAY")
+            for name in ("ccd_count", "fep_count", "vid_board", "clocking"):
+                sampler.set_data(model.comp[name], states[name])
+            pitch, roll = calc_pitch_roll(model.times, ephem, states, sampler=sampler)
+            model.comp["roll"].set_data(roll, model.times)
+            model.comp["pitch"].set_data(pitch, model.times)
+
+            if self.name in self._heater_models and state0 is not None:
+                # Detector housing heater contribution to heating
+                dh_heater_times, dh_heater = self.get_heater_history()
+                model.comp["dh_heater"].set_data(dh_heater, dh_heater_times)
+
+            # The template is a copy, which is kept pristine while this
+            # model is run
+            if reuse:
+                if len(self._model_templates) >= self._max_model_templates:
+                    self._model_templates.pop(next(iter(self._model_templates)))
+                self._model_templates[template_key] = (
+                    copy.deepcopy(model),
+                    ephem,
+                    sampler,
+                )
+        else:
+            mylog.info("Reusing the inputs of the %s model", self.name.upper())
+            model, ephem, sampler = template
+            model = copy.deepcopy(model)
 
         if state0 is not None:
             model.comp[self.msid].set_data(state0[self.msid], None)
 
-        self._calc_model_supp(model, state_times, states, ephem, state0)
+        self._calc_model_supp(model, sampler, states, ephem, state0)
+
+        if node_init is not None:
+            for node, value in node_init.items():
+                model.comp[node].set_data(value, None)
+
+        # If the model has already been run with exactly the same
+        # inputs, use the cached results instead of running it again
+        cache_key = None
+        if self.model_cache is not None:
+            cache_key = self._model_cache_key(
+                model,
+                model_spec,
+                states,
+                tstart,
+                tstop,
+                state0,
+                ephem,
+                node_init,
+            )
+        if cache_key is not None:
+            cached_model = self.model_cache.get(cache_key, self.name)
+            if cached_model is not None:
+                mylog.info("Using cached results of the %s model", self.name.upper())
+                return cached_model
 
         model.make()
         model.calc()
 
-        return model
+        if cache_key is not None:
+            self.model_cache.put(
+                cache_key,
+                model,
+                [self.msid] + self._cached_mvals,
+                self._cached_dvals,
+            )
+
+        return model
+
+    def _model_cache_key(
+        self, model, model_spec, states, tstart, tstop, state0, ephem, node_init
+    ):
+        """
+        Make the key of a model run in the model cache, once all of
+        the inputs of the model have been set. Returns None if the
+        results of the model run should not be cached.
+
+        Parameters
+        ----------
+        model : xija.ThermalModel
+            The model, with all of its inputs set.
+        model_spec : dict
+            The model specification.
+        states : NumPy record array
+            Commanded states
+        tstart : float
+            The start time of the model run.
+        tstop : float
+            The end time of the model run.
+        state0 : dict or None
+            The initial state of the model run.
+        ephem : dict of NumPy arrays
+            The ephemeris interpolated to the model times.
+        node_init : dict or None
+            Initial temperatures of model nodes indexed by node name.
+        """
+        import xija
+
+        extra = [
+            type(self).__name__,
+            version,
+            xija.__version__,
+            sorted((node_init or {}).items()),
+        ]
+        if self.name in self._heater_models and state0 is not None:
+            dh_heater_times, dh_heater = self.get_heater_history()
+            h = hashlib.sha256(np.ascontiguousarray(dh_heater_times).tobytes())
+            h.update(np.ascontiguousarray(dh_heater).tobytes())
+            extra.append(h.hexdigest())
+        # xija fetches the telemetry of the components whose data were
+        # not set (e.g. the temperatures for a validation run), padded by
+        # 2000 s. Until the archive covers all of it the telemetry may
+        # still change, so the results are not cached.
+        for comp in model.comps:
+            msid = getattr(comp, "msid", None)
+            if msid is None or getattr(comp, "data", 0) is not None:
+                continue
+            try:
+                t_archive = fetch.get_time_range(msid)[1]
+            except (KeyError, ValueError):
+                # Not in the archive, e.g. a pseudo-node
+                continue
+            if t_archive < tstop + 2000.0:
+                mylog.info(
+                    "Not caching the results of the %s model, since the "
+                    "archive does not yet cover the %s telemetry up to %s",
+                    self.name.upper(),
+                    msid.upper(),
+                    CxoTime(tstop).date,
+                )
+                return None
+        return self.model_cache.make_key(
+            self.name,
+            model_spec,
+            states,
+            tstart,
+            tstop,
+            state0,
+            ephem,
+            extra=extra,
+        )
 
     def make_validation_viols(self, plots_validation):
         """
@@ -601,7 +1751,7 @@ class ACISThermalCheck:
         # Gather the perigee passages that occur from the
         # beginning of the model run up to the start of the load
         # from kadi
-        rzs = events.rad_zones.filter(plot_start, load_start)
+        rzs = self.get_rad_zones(plot_start, load_start)
         for rz in rzs:
             self.perigee_passages["entry"].append(rz.start)
             self.perigee_passages["perigee"].append(rz.perigee)
@@ -619,10 +1769,9 @@ class ACISThermalCheck:
                 continue
             self.perigee_passages[key].append(cmd["time"])
 
-    def _make_state_plots(self, plots, num_figs, w1, plot_start, states, load_start):
+    def _make_state_plots(self, plots, w1, plot_start, states, load_start):
         # Make a plot of ACIS CCDs and SIM-Z position
         plots["pow_sim"] = PredictPlot(
-            fig_id=num_figs + 1,
             title="ACIS CCDs/FEPs and SIM-Z position",
             xlabel="Date",
             x=pointpair(states["tstart"], states["tstop"]),
@@ -647,7 +1796,6 @@ class ACISThermalCheck:
             plt_name = "roll_taco"
             # Make a plot of off-nominal roll and earth solid angle
             plots["roll_taco"] = PredictPlot(
-                fig_id=num_figs + 2,
                 title="Off-Nominal Roll and Earth Solid Angle in Rad FOV",
                 xlabel="Date",
                 x=self.predict_model.times,
@@ -667,7 +1815,6 @@ class ACISThermalCheck:
             plt_name = "roll"
             # Make a plot of off-nominal roll
             plots["roll"] = PredictPlot(
-                fig_id=num_figs + 2,
                 title="Off-Nominal Roll",
                 xlabel="Date",
                 x=self.predict_model.times,
@@ -713,7 +1860,6 @@ class ACISThermalCheck:
         w1 = None
         mylog.info("Making temperature prediction plots")
         plots[self.name] = PredictPlot(
-            fig_id=1,
             x=times,
             y=temps[self.name],
             x2=times,
@@ -726,6 +1872,7 @@ class ACISThermalCheck:
             width=w1,
             load_start=load_start,
         )
+        self._plot_ensemble(plots[self.name])
         ymin, ymax = plots[self.name].ax.get_ylim()
         # Add horizontal lines for yellow limits, if necessary
         for key in self.limit_object.alt_names.values():
@@ -758,7 +1905,7 @@ class ACISThermalCheck:
         # of all the weekly prediction plots are the same.
         w1, _ = plots[self.name].fig.get_size_inches()
 
-        self._make_state_plots(plots, 1, w1, plot_start, states, load_start)
+        self._make_state_plots(plots, w1, plot_start, states, load_start)
 
         plots["default"] = plots[self.name]
 
@@ -778,11 +1925,14 @@ class ACISThermalCheck:
 
         # Now write all of the plots after possible
         # customizations have been made
-        for key, plot in plots.items():
-            if key != self.msid:
-                outfile = outdir / plot.filename
-                mylog.debug("Writing plot file %s" % outfile)
-                plot.fig.savefig(outfile)
+        save_figures(
+            [
+                (plot.fig, outdir / plot.filename)
+                for key, plot in plots.items()
+                if key != self.msid
+            ],
+            workers=self.plot_workers,
+        )
 
         return plots
 
@@ -813,6 +1963,159 @@ class ACISThermalCheck:
             masks.append(mask)
         return masks
 
+    def get_validation_labels(self):
+        """
+        The axis labels of the validated MSIDs in the validation plots.
+        """
+        return {
+            self.msid: r"Temperature ($^\circ$C)",
+            "pitch": "Pitch (deg)",
+            "tscpos": "SIM-Z (steps/1000)",
+            "roll": "Off-Nominal Roll (deg)",
+        }
+
+    def get_validation_formats(self):
+        """
+        The formats of the quantiles of the residuals of the validated
+        MSIDs in the quantile table.
+        """
+        return {self.msid: "%.2f", "pitch": "%.3f", "tscpos": "%d", "roll": "%.3f"}
+
+    def get_validation_data(self, tlm, model):
+        """
+        Get the model values of the validated MSIDs, along with the
+        telemetry interpolated to the model times and a mask of the
+        times for which the validation is valid.
+
+        Parameters
+        ----------
+        tlm : NumPy record array
+            NumPy record array of telemetry
+        model : xija.ThermalModel
+            The model run for the validation.
+
+        Returns
+        -------
+        The model values keyed by MSID, the telemetry at the model
+        times, and the mask of good times.
+        """
+        # Use an OrderedDict here because we want the plots on the validation
+        # page to appear in this order
+        pred = OrderedDict(
+            [
+                (self.msid, model.comp[self.msid].mvals),
+                ("pitch", model.comp["pitch"].mvals),
+                ("tscpos", model.comp["sim_z"].mvals),
+            ],
+        )
+        if "roll" in model.comp:
+            pred["roll"] = model.comp["roll"].mvals
+
+        # Interpolate the model and data to a consistent set of times
+        idxs = ska_numpy.interpolate(
+            np.arange(len(tlm)),
+            tlm["date"],
+            model.times,
+            method="nearest",
+        )
+        tlm = tlm[idxs]
+
+        # Set up a mask of "good times" for which the validation is
+        # "valid", e.g., not during situations where we expect in
+        # advance that telemetry and model data will not match. This
+        # is so we do not flag violations during these times
+        good_mask = np.ones(len(tlm), dtype="bool")
+        if hasattr(model, "bad_times"):
+            for interval in model.bad_times:
+                bad = (tlm["date"] >= CxoTime(interval[0]).secs) & (
+                    tlm["date"] < CxoTime(interval[1]).secs
+                )
+                good_mask[bad] = False
+
+        return pred, tlm, good_mask
+
+    def get_residual_masks(self, tlm, good_mask):
+        """
+        Get the masks of the times whose residuals of the modeled MSID
+        are used for its quantiles and histogram, and for its second
+        histogram if the model has a second histogram limit.
+
+        Parameters
+        ----------
+        tlm : NumPy record array
+            The telemetry at the model times.
+        good_mask : NumPy boolean array
+            The mask of the times for which the validation is valid.
+
+        Returns
+        -------
+        The two masks. The second one is None if the model has only
+        one histogram limit.
+        """
+        masks = self.get_histogram_mask(tlm, self.hist_limit)
+        ok = masks[0] & good_mask
+        # Some models have a second histogram limit
+        ok2 = None
+        if len(self.hist_limit) == 2:
+            ok2 = masks[1] & good_mask
+        return ok, ok2
+
+    def make_residual_sketches(self, tlm, model, tmin=None, tmax=None):
+        """
+        Sketch the distributions of the validation residuals (data -
+        model) of each validated MSID, so that they can be merged with
+        the sketches of other validation runs.
+
+        Parameters
+        ----------
+        tlm : NumPy record array
+            NumPy record array of telemetry
+        model : xija.ThermalModel
+            The model run for the validation.
+        tmin : float, optional
+            Only the residuals at times from this time onward are
+            sketched. Default: None, which means no lower bound.
+        tmax : float, optional
+            Only the residuals at times before this time are sketched.
+            Default: None, which means no upper bound.
+
+        Returns
+        -------
+        A dictionary of lists of :class:`~acis_thermal_check.sketch.ResidualSketch`
+        keyed by MSID. The modeled MSID has a second sketch, for its second
+        histogram limit, if the model has one.
+        """
+        pred, tlm, good_mask = self.get_validation_data(tlm, model)
+        in_range = np.ones(len(tlm), dtype=bool)
+        if tmin is not None:
+            in_range &= tlm["date"] >= tmin
+        if tmax is not None:
+            in_range &= tlm["date"] < tmax
+        fmts = self.get_validation_formats()
+        sketches = {}
+        for msid in pred:
+            # The residuals are resolved to the precision they are
+            # written out with in the quantile table
+            if fmts[msid] == "%d":
+                resolution = 1.0
+            else:
+                resolution = 10.0 ** -int(fmts[msid][2:-1])
+            diff = tlm[msid] - pred[msid]
+            # As for the quantile table, only the residuals of the
+            # modeled MSID are masked
+            if msid == self.msid:
+                masks = self.get_residual_masks(tlm, good_mask & in_range)
+            else:
+                masks = (in_range,)
+            sketches[msid] = []
+            for ok in masks:
+                if ok is None:
+                    continue
+                sketch = ResidualSketch(resolution)
+                sketch.update(diff[ok])
+                sketches[msid].append(sketch)
+        return sketches
+
     def make_validation_plots(self, tlm, model_spec, outdir):
         """
         Make validation output plots by running the thermal model from a
@@ -845,7 +2148,7 @@ class ACISThermalCheck:
 
         # Run the thermal model from the beginning of obtained telemetry
         # to the end, so we can compare its outputs to the real values
-        model = self.calc_model(model_spec, states, start, stop)
+        model = self.calc_validation_model(model_spec, states, start, stop)
 
         self.validate_model = model
 
@@ -863,74 +2166,93 @@ class ACISThermalCheck:
         else:
             lower_limit = None
 
-        # Use an OrderedDict here because we want the plots on the validation
-        # page to appear in this order
-        pred = OrderedDict(
-            [
-                (self.msid, model.comp[self.msid].mvals),
-                ("pitch", model.comp["pitch"].mvals),
-                ("tscpos", model.comp["sim_z"].mvals),
-            ],
-        )
-        if "roll" in model.comp:
-            pred["roll"] = model.comp["roll"].mvals
-
-        # Interpolate the model and data to a consistent set of times
-        idxs = ska_numpy.interpolate(
-            np.arange(len(tlm)),
-            tlm["date"],
-            model.times,
-            method="nearest",
-        )
-        tlm = tlm[idxs]
+        pred, tlm, good_mask = self.get_validation_data(tlm, model)
 
         # Set up labels for validation plots
-        labels = {
-            self.msid: r"Temperature ($^\circ$C)",
-            "pitch": "Pitch (deg)",
-            "tscpos": "SIM-Z (steps/1000)",
-            "roll": "Off-Nominal Roll (deg)",
-        }
+        labels = self.get_validation_labels()
 
         scales = {"tscpos": 1000.0}
 
-        fmts = {self.msid: "%.2f", "pitch": "%.3f", "tscpos": "%d", "roll": "%.3f"}
-
-        # Set up a mask of "good times" for which the validation is
-        # "valid", e.g., not during situations where we expect in
-        # advance that telemetry and model data will not match. This
-        # is so we do not flag violations during these times
-        good_mask = np.ones(len(tlm), dtype="bool")
-        if hasattr(model, "bad_times"):
-            for interval in model.bad_times:
-                bad = (tlm["date"] >= CxoTime(interval[0]).secs) & (
-                    tlm["date"] < CxoTime(interval[1]).secs
-                )
-                good_mask[bad] = False
-
-        # find perigee passages
-        rzs = events.rad_zones.filter(start, stop)
+        fmts = self.get_validation_formats()
 
         plots = {}
-        mylog.info(
-            "Making %s model validation plots and quantile table",
-            self.name.upper(),
-        )
-        quantiles = (1, 5, 16, 50, 84, 95, 99)
+        mylog.info("Making %s model quantile table", self.name.upper())
+        quantiles = self._valid_quantiles
         # store lines of quantile table in a string and write out later
         quant_table = ""
         quant_head = ",".join(["MSID"] + ["quant%d" % x for x in quantiles])
         quant_table += quant_head + "\n"
-        xmin, xmax = cxctime2plotdate(model.times)[[0, -1]]
-        fig_id = 0
+        # The quantiles of the residuals of all of the MSIDs whose
+        # residuals are not masked are found in one pass
+        unmasked = [msid for msid in pred if msid != self.msid]
+        if len(unmasked) > 0:
+            resids = np.array([tlm[msid] - pred[msid] for msid in unmasked])
+            resid_quants = calc_quantiles(resids, quantiles)
+        # The residuals which go into the histograms of each MSID
+        hist_diffs = {}
         for msid in pred:
             plot = {}
-            fig = plt.figure(10 + fig_id, figsize=(12, 6))
-            fig.clf()
+            # Figure out histogram masks
+            ok2 = None
+            if msid == self.msid:
+                ok, ok2 = self.get_residual_masks(tlm, good_mask)
+                diff = tlm[msid][ok] - pred[msid][ok]
+                msid_quants = calc_quantiles(diff, quantiles)
+            else:
+                row = unmasked.index(msid)
+                diff = resids[row]
+                msid_quants = {quant: resid_quants[quant][row] for quant in quantiles}
+            quant_line = "%s" % msid
+            for quant in quantiles:
+                quant_val = msid_quants[quant]
+                plot["quant%02d" % quant] = fmts[msid] % quant_val
+                quant_line += "," + fmts[msid] % quant_val
+            quant_table += quant_line + "\n"
+            hist_diffs[msid] = [(diff, thermal_blue)]
+            if ok2 is not None and ok2.any():
+                diff2 = tlm[msid][ok2] - pred[msid][ok2]
+                hist_diffs[msid].append((diff2, thermal_red))
+            plots[msid] = plot
+
+        # Write quantile tables to a CSV file
+        filename = outdir / "validation_quant.csv"
+        mylog.info("Writing quantile table %s" % filename)
+        with open(filename, "w") as f:
+            f.write(quant_table)
+
+        # self.write_pickle is set to the value of True or False based upon the
+        # value of the command line argument: --run-start. --run-start can be
+        # either a DOY date string or None (if the argument
+        # was not specified). If a DOY date, this model run is likely for regression
+        # testing or other debugging. In that case write out the full
+        # predicted and telemetered dataset as a pickle.
+        if self.write_pickle:
+            filename = outdir / "validation_data.pkl"
+            mylog.info("Writing validation data %s" % filename)
+            with open(filename, "wb") as f:
+                pickle.dump({"pred": pred, "tlm": tlm}, f, protocol=2)
+
+        # Only the data products are made, without any plots
+        if self.products_only:
+            return plots
+
+        # find perigee passages
+        rzs = self.get_rad_zones(start, stop)
+        rz_xpos = [
+            ptime for rz in rzs for ptime in cxctime2plotdate([rz.tstart, rz.tstop])
+        ]
+
+        mylog.info("Making %s model validation plots", self.name.upper())
+        xmin, xmax = cxctime2plotdate(model.times)[[0, -1]]
+        # The lines are decimated to a few points per pixel column
+        # of the plots, which are all 12 inches wide
+        num_bins = int(12 * matplotlib.rcParams["figure.dpi"])
+        for msid in pred:
+            plot = plots[msid]
+            fig = Figure(figsize=(12, 6))
             scale = scales.get(msid, 1.0)
             ticklocs, fig, ax = plot_cxctime(
-                model.times,
-                pred[msid] / scale,
+                *decimate_minmax(model.times, pred[msid] / scale, num_bins),
                 label="Model",
                 fig=fig,
                 ls="-",
@@ -939,8 +2261,7 @@ class ACISThermalCheck:
                 zorder=9,
             )
             ticklocs, fig, ax = plot_cxctime(
-                model.times,
-                tlm[msid] / scale,
+                *decimate_minmax(model.times, tlm[msid] / scale, num_bins),
                 label="Data",
                 fig=fig,
                 ls="-",
@@ -962,10 +2283,9 @@ class ACISThermalCheck:
             ax.grid()
             ax.set_axisbelow(True)
             # add lines for perigee passages
-            for rz in rzs:
-                ptimes = cxctime2plotdate([rz.tstart, rz.tstop])
-                for ptime in ptimes:
-                    ax.axvline(ptime, ls="--", color="C2", linewidth=2, zorder=2)
+            add_vertical_lines(
+                ax, rz_xpos, linestyle="--", color="C2", linewidth=2, zorder=2
+            )
             # Add lines for all the limits and make sure we can see the
             # lines by adjusting ymin/ymax accordingly.
             if self.msid == msid:
@@ -1012,61 +2332,36 @@ class ACISThermalCheck:
 
             plot["lines"] = {"fig": fig, "ax": ax, "filename": msid + "_valid.png"}
 
-            # Figure out histogram masks
-            if msid == self.msid:
-                masks = self.get_histogram_mask(tlm, self.hist_limit)
-                ok = masks[0] & good_mask
-                # Some models have a second histogram limit
-                if len(self.hist_limit) == 2:
-                    ok2 = masks[1] & good_mask
-                else:
-                    ok2 = np.zeros(tlm[msid].size, dtype=bool)
-            else:
-                ok = np.ones(tlm[msid].size, dtype=bool)
-                ok2 = np.zeros(tlm[msid].size, dtype=bool)
-            diff = np.sort(tlm[msid][ok] - pred[msid][ok])
-            if ok2.any():
-                diff2 = np.sort(tlm[msid][ok2] - pred[msid][ok2])
-            quant_line = "%s" % msid
-            for quant in quantiles:
-                quant_val = diff[(len(diff) * quant) // 100]
-                plot["quant%02d" % quant] = fmts[msid] % quant_val
-                quant_line += "," + fmts[msid] % quant_val
-            quant_table += quant_line + "\n"
+            # The residuals are binned once, and the same bins are used
+            # for both of the histogram plots
+            hists = [
+                (np.histogram(diff / scale, bins=50), color)
+                for diff, color in hist_diffs[msid]
+            ]
             # We make two histogram plots for each validation,
             # one with linear and another with log scaling.
-            fig, axes = plt.subplots(ncols=2, num=20 + fig_id, figsize=(12.0, 3.5))
+            fig = Figure(figsize=(12.0, 3.5))
+            axes = fig.subplots(ncols=2)
             for i, histscale in enumerate(("log", "lin")):
                 ax = axes[i]
-                ax.hist(
-                    diff / scale,
-                    bins=50,
-                    log=(histscale == "log"),
-                    histtype="step",
-                    color=thermal_blue,
-                    linewidth=2,
-                )
-                if ok2.any():
+                for (counts, edges), color in hists:
                     ax.hist(
-                        diff2 / scale,
-                        bins=50,
+                        edges[:-1],
+                        bins=edges,
+                        weights=counts,
                         log=(histscale == "log"),
-                        color=thermal_red,
                         histtype="step",
+                        color=color,
                         linewidth=2,
                     )
                 ax.set_title(f"{msid.upper()} residuals: data - model")
                 ax.set_xlabel(labels[msid])
             fig.subplots_adjust(bottom=0.18, left=0.15, wspace=0.6)
             plot["hist"] = {"fig": fig, "ax": ax, "filename": f"{msid}_valid_hist.png"}
-            fig_id += 1
-            plots[msid] = plot
 
-        fig = plt.figure(10 + fig_id, figsize=(12, 6))
-        fig.clf()
+        fig = Figure(figsize=(12, 6))
         ticklocs, fig, ax = plot_cxctime(
-            model.times,
-            model.comp["ccd_count"].dvals,
+            *decimate_minmax(model.times, model.comp["ccd_count"].dvals, num_bins),
             fig=fig,
             ls="-",
             lw=2,
@@ -1074,8 +2369,7 @@ class ACISThermalCheck:
             zorder=10,
         )
         ticklocs, fig, ax = plot_cxctime(
-            model.times,
-            model.comp["fep_count"].dvals,
+            *decimate_minmax(model.times, model.comp["fep_count"].dvals, num_bins),
             fig=fig,
             ls="--",
             lw=2,
@@ -1091,26 +2385,21 @@ class ACISThermalCheck:
         ax.lines[0].set_label("CCDs")
         ax.lines[1].set_label("FEPs")
         # add lines for perigee passages
-        for rz in rzs:
-            ptimes = cxctime2plotdate([rz.tstart, rz.tstop])
-            for ptime in ptimes:
-                ax.axvline(ptime, ls="--", color="C2", linewidth=2, zorder=2)
+        add_vertical_lines(
+            ax, rz_xpos, linestyle="--", color="C2", linewidth=2, zorder=2
+        )
         ax.legend(fancybox=True, framealpha=0.5, loc=2)
         plots["ccd_count"] = {
             "lines": {"fig": fig, "ax": ax, "filename": "ccd_count_valid.png"},
         }
 
-        fig_id += 1
-
         if self.name == "cea":
             for msid in ["2imonst", "2sponst", "2s2onst"]:
-                fig = plt.figure(10 + fig_id, figsize=(12, 6))
-                fig.clf()
+                fig = Figure(figsize=(12, 6))
                 comp_hrc = model.comp[f"{msid}_on"].dvals
                 tlm_hrc = np.char.strip(tlm[msid]) == "ON"
                 ticklocs, fig, ax = plot_cxctime(
-                    model.times,
-                    comp_hrc,
+                    *decimate_minmax(model.times, comp_hrc, num_bins),
                     label="Model",
                     fig=fig,
                     ls="-",
@@ -1119,8 +2408,7 @@ class ACISThermalCheck:
                     zorder=9,
                 )
                 ticklocs, fig, ax = plot_cxctime(
-                    model.times,
-                    tlm_hrc,
+                    *decimate_minmax(model.times, tlm_hrc, num_bins),
                     label="Data",
                     fig=fig,
                     ls="-",
@@ -1134,22 +2422,22 @@ class ACISThermalCheck:
                 ax.set_yticklabels(["OFF", "ON"])
                 ax.set_ylim([-0.1, 1.1])
                 # add lines for perigee passages
-                for rz in rzs:
-                    ptimes = cxctime2plotdate([rz.tstart, rz.tstop])
-                    for ptime in ptimes:
-                        ax.axvline(ptime, ls="--", color="C2", linewidth=2, zorder=2)
+                add_vertical_lines(
+                    ax, rz_xpos, linestyle="--", color="C2", linewidth=2, zorder=2
+                )
                 ax.legend(fancybox=True, framealpha=0.5, loc=2)
                 plots[msid] = {
                     "lines": {"fig": fig, "ax": ax, "filename": f"{msid}_valid.png"},
                 }
-                fig_id += 1
 
         if "earthheat__fptemp" in model.comp:
-            fig = plt.figure(10 + fig_id, figsize=(12, 6))
-            fig.clf()
+            fig = Figure(figsize=(12, 6))
             ticklocs, fig, ax = plot_cxctime(
-                model.times,
-                model.comp["earthheat__fptemp"].dvals,
+                *decimate_minmax(
+                    model.times,
+                    model.comp["earthheat__fptemp"].dvals,
+                    num_bins,
+                ),
                 fig=fig,
                 ls="-",
                 lw=2,
@@ -1164,10 +2452,9 @@ class ACISThermalCheck:
             ax.set_xlim(xmin, xmax)
             ax.set_ylim(1.0e-3, 1.0)
             # add lines for perigee passages
-            for rz in rzs:
-                ptimes = cxctime2plotdate([rz.tstart, rz.tstop])
-                for ptime in ptimes:
-                    ax.axvline(ptime, ls="--", color="C2", linewidth=2, zorder=2)
+            add_vertical_lines(
+                ax, rz_xpos, linestyle="--", color="C2", linewidth=2, zorder=2
+            )
 
             plots["earthheat__fptemp"] = {
                 "lines": {
@@ -1177,8 +2464,6 @@ class ACISThermalCheck:
                 },
             }
 
-            fig_id += 1
-
         if self.msid == "fptemp":
             anchor = (0.21, 0.99)
         else:
@@ -1193,30 +2478,15 @@ class ACISThermalCheck:
 
         # Now write all of the plots after possible
         # customizations have been made
-        for plot in plots.values():
-            for key in plot:
-                if key in ["lines", "hist"]:
-                    outfile = outdir / plot[key]["filename"]
-                    mylog.debug("Writing plot file %s" % outfile)
-                    plot[key]["fig"].savefig(outfile)
-
-        # Write quantile tables to a CSV file
-        filename = outdir / "validation_quant.csv"
-        mylog.info("Writing quantile table %s" % filename)
-        with open(filename, "w") as f:
-            f.write(quant_table)
-
-        # self.write_pickle is set to the value of True or False based upon the
-        # value of the command line argument: --run-start. --run-start can be
-        # either a DOY date string or None (if the argument
-        # was not specified). If a DOY date, this model run is likely for regression
-        # testing or other debugging. In that case write out the full
-        # predicted and telemetered dataset as a pickle.
-        if self.write_pickle:
-            filename = outdir / "validation_data.pkl"
-            mylog.info("Writing validation data %s" % filename)
-            with open(filename, "wb") as f:
-                pickle.dump({"pred": pred, "tlm": tlm}, f, protocol=2)
+        save_figures(
+            [
+                (plot[key]["fig"], outdir / plot[key]["filename"])
+                for plot in plots.values()
+                for key in plot
+                if key in ["lines", "hist"]
+            ],
+            workers=self.plot_workers,
+        )
 
         return plots
 
@@ -1321,7 +2591,14 @@ class ACISThermalCheck:
         """
 
         if args.model_spec is None:
-            model_spec, cm_version = get_xija_model_spec(self.name)
+            if self.shared_inputs is not None:
+                model_spec, cm_version = self.shared_inputs.get_model_spec(self.name)
+            else:
+                model_spec, cm_version = get_model_spec(
+                    self.name,
+                    version=getattr(args, "chandra_models_version", None),
+                    cache_dir=getattr(args, "cache_dir", None),
+                )
             ms_out = f"chandra_models v{cm_version}"
         else:
             model_spec = args.model_spec
@@ -1400,19 +2677,12 @@ class ACISThermalCheck:
 
         return tstart, tstop, t_run_start
 
-    def get_telem_values(self, tstart, days=14):
+    def get_telem_msids(self):
         """
-        Fetch last ``days`` of available telemetry values before
-        time ``tstart``.
-
-        Parameters
-        ----------
-        tstart: float
-            Start time for telemetry (secs)
-        days: integer, optional
-            Length of telemetry request before ``tstart`` in days. Default: 14
+        Get the list of MSIDs which are fetched from the engineering
+        archive for this model, and the map from MSID names to the
+        names used for them in the telemetry array.
         """
-        # Get temperature and other telemetry for 3 weeks prior to min(tstart, NOW)
         the_msid = self.msid
         if self.other_map is not None:
             for key, value in self.other_map.items():
@@ -1431,11 +2701,59 @@ class ACISThermalCheck:
         if self.other_map is not None:
             name_map.update(self.other_map)
 
+        return telem_msids, name_map
+
+    def fetch_telem_msids(self, telem_msids, tstart, days, interpolate=True):
+        """
+        Fetch ``days`` of 5-minute telemetry for a list of MSIDs
+        before time ``tstart``, interpolated to a common set of
+        times.
+
+        Parameters
+        ----------
+        telem_msids : list of strings
+            The MSIDs to fetch.
+        tstart: float
+            Start time for telemetry (secs)
+        days: integer
+            Length of telemetry request before ``tstart`` in days.
+        interpolate : boolean, optional
+            If False, the telemetry is returned as it was fetched, and
+            may be interpolated later with :meth:`interpolate_telem_msids`.
+            Default: True
+        """
         tstart = CxoTime(tstart).secs
         start = CxoTime(tstart - days * 86400).date
         stop = CxoTime(tstart).date
         mylog.info("Fetching telemetry between %s and %s", start, stop)
-        msidset = fetch.MSIDset(telem_msids, start, stop, stat="5min")
+        if self.telem_cache is None:
+            msidset = fetch.MSIDset(telem_msids, start, stop, stat="5min")
+        else:
+            msidset = self.telem_cache.get_msidset(
+                telem_msids, start, stop, stat="5min"
+            )
+        if not interpolate:
+            return msidset
+        return self.interpolate_telem_msids(msidset, tstart, days)
+
+    def interpolate_telem_msids(self, msidset, tstart, days):
+        """
+        Interpolate fetched telemetry to a common set of times, 5
+        minutes apart, over the span where all of the MSIDs have data.
+
+        Parameters
+        ----------
+        msidset : MSIDset object
+            The telemetry, which is interpolated in place.
+        tstart: float
+            Start time for telemetry (secs)
+        days: integer
+            Length of telemetry request before ``tstart`` in days.
+        """
+        if any(len(x.times) == 0 for x in msidset.values()):
+            raise ValueError(
+                "Found no telemetry within %d days of %s" % (days, str(tstart)),
+            )
         start = max(x.times[0] for x in msidset.values())
         stop = min(x.times[-1] for x in msidset.values())
         # Interpolate the MSIDs to a common set of times, 5 mins apart (328 s)
@@ -1447,6 +2765,30 @@ class ACISThermalCheck:
                 "Found no telemetry within %d days of %s" % (days, str(tstart)),
             )
 
+        return msidset
+
+    def get_telem_values(self, tstart, days=14):
+        """
+        Fetch last ``days`` of available telemetry values before
+        time ``tstart``.
+
+        Parameters
+        ----------
+        tstart: float
+            Start time for telemetry (secs)
+        days: integer, optional
+            Length of telemetry request before ``tstart`` in days. Default: 14
+        """
+        # Get temperature and other telemetry for 3 weeks prior to min(tstart, NOW)
+        telem_msids, name_map = self.get_telem_msids()
+
+        # When running alongside other models, the telemetry for all of
+        # them is fetched at once and shared
+        if self.shared_inputs is not None:
+            msidset = self.shared_inputs.get_msidset(self, tstart, days)
+        else:
+            msidset = self.fetch_telem_msids(telem_msids, tstart, days)
+
         # Construct the NumPy record array of telemetry values
         # for the different MSIDs (temperatures, pitch, etc).
         # In some cases we replace the MSID name with something
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+class ResidualSketch:
+    """
+    A mergeable sketch of the distribution of a stream of residuals,
+    from which their quantiles and histogram can be found in bounded
+    memory, without keeping the residuals themselves.
+
+    The residuals are counted in bins of width *resolution*, so that
+    the quantiles are accurate to within half of the resolution. The
+    sketches of different chunks of a stream, e.g. made by parallel
+    workers, are combined with :meth:`merge`, as long as they have the
+    same resolution.
+
+    Parameters
+    ----------
+    resolution : float
+        The width of the bins the residuals are counted in.
+    max_bins : integer, optional
+        The maximum number of bins. Residuals which are too far from
+        zero to fit are counted in the outermost bins, so that a few
+        wild values cannot make the sketch grow without bound. Their
+        values still set the range of the histogram. Default: 1000000
+    """
+
+    def __init__(self, resolution, max_bins=1000000):
+        self.resolution = resolution
+        self.max_bins = max_bins
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.vmin = np.inf
+        self.vmax = -np.inf
+
+    @property
+    def count(self):
+        """
+        The number of residuals in the sketch.
+        """
+        return int(self.counts.sum())
+
+    def _extend(self, lo, hi):
+        # Extend the bins so that they cover bins lo through hi
+        if self.counts.size == 0:
+            self.offset = lo
+            self.counts = np.zeros(hi - lo + 1, dtype=np.int64)
+            return
+        new_lo = min(lo, self.offset)
+        new_hi = max(hi, self.offset + self.counts.size - 1)
+        if new_lo == self.offset and new_hi == self.offset + self.counts.size - 1:
+            return
+        counts = np.zeros(new_hi - new_lo + 1, dtype=np.int64)
+        i0 = self.offset - new_lo
+        counts[i0 : i0 + self.counts.size] = self.counts
+        self.offset = new_lo
+        self.counts = counts
+
+    def update(self, values):
+        """
+        Add a chunk of residuals to the sketch. Values which are not
+        finite are ignored.
+
+        Parameters
+        ----------
+        values : array-like
+            The residuals.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        half = self.max_bins // 2
+        bins = np.floor(values / self.resolution)
+        bins = np.clip(bins, -half, half - 1).astype(np.int64)
+        self._extend(bins.min(), bins.max())
+        self.counts += np.bincount(bins - self.offset, minlength=self.counts.size)
+        self.vmin = min(self.vmin, values.min())
+        self.vmax = max(self.vmax, values.max())
+
+    def merge(self, other):
+        """
+        Add the residuals counted in another sketch to this one.
+
+        Parameters
+        ----------
+        other : :class:`ResidualSketch`
+            The sketch to merge into this one, which must have the
+            same resolution.
+        """
+        if other.resolution != self.resolution:
+            raise ValueError(
+                "Cannot merge sketches with resolutions %g and %g!"
+                % (self.resolution, other.resolution),
+            )
+        if other.counts.size == 0:
+            return
+        self._extend(other.offset, other.offset + other.counts.size - 1)
+        i0 = other.offset - self.offset
+        self.counts[i0 : i0 + other.counts.size] += other.counts
+        self.vmin = min(self.vmin, other.vmin)
+        self.vmax = max(self.vmax, other.vmax)
+
+    def quantiles(self, quantiles):
+        """
+        Find quantiles of the residuals. As for the quantile table of
+        the validation, the q-th quantile is the value at index
+        ``(n * q) // 100`` of the sorted residuals, here taken as the
+        center of the bin it falls in.
+
+        Parameters
+        ----------
+        quantiles : list of integers
+            The quantiles to find, in percent.
+
+        Returns
+        -------
+        A dictionary of the quantiles, keyed by the values of *quantiles*.
+        """
+        n = self.count
+        if n == 0:
+            raise ValueError("Cannot find the quantiles of an empty sketch!")
+        cumcounts = np.cumsum(self.counts)
+        values = {}
+        for quant in quantiles:
+            i = np.searchsorted(cumcounts, (n * quant) // 100, side="right")
+            value = (self.offset + i + 0.5) * self.resolution
+            values[quant] = min(max(value, self.vmin), self.vmax)
+        return values
+
+    def histogram(self, bins=50):
+        """
+        Make a histogram of the residuals, with equal-width bins
+        between the smallest and largest residual.
+
+        Parameters
+        ----------
+        bins : integer, optional
+            The number of bins. Default: 50
+
+        Returns
+        -------
+        The counts in each bin, and the edges of the bins.
+        """
+        centers = (self.offset + np.arange(self.counts.size) + 0.5) * self.resolution
+        centers = np.clip(centers, self.vmin, self.vmax)
+        return np.histogram(
+            centers,
+            bins=bins,
+            range=(self.vmin, self.vmax),
+            weights=self.counts,
+        )
@@ -0,0 +1,227 @@
+import os
+import time
+import types
+
+import numpy as np
+import pytest
+
+from acis_thermal_check.cache import (
+    STAT_DT,
+    CachedMSID,
+    CachedMSIDset,
+    ModelCache,
+    TelemetryCache,
+)
+
+
+def _samples(start, stop, offset=0.0):
+    times = np.arange(start, stop, STAT_DT)
+    return times, times * 0.5 + offset
+
+
+def test_merge_overlapping():
+    old = TelemetryCache._merge(None, *_samples(0.0, 100.0 * STAT_DT))
+    new_times, new_vals = _samples(50.0 * STAT_DT, 150.0 * STAT_DT, offset=1.0)
+    times, vals, spans = TelemetryCache._merge(old, new_times, new_vals)
+    # One contiguous span, with the new samples replacing the old ones
+    np.testing.assert_array_equal(times, np.arange(0.0, 150.0 * STAT_DT, STAT_DT))
+    np.testing.assert_array_equal(vals[:50], old[1][:50])
+    np.testing.assert_array_equal(vals[50:], new_vals)
+    np.testing.assert_array_equal(spans, [[0.0, 149.0 * STAT_DT]])
+
+
+def test_merge_abutting():
+    old = TelemetryCache._merge(None, *_samples(0.0, 100.0 * STAT_DT))
+    new = _samples(100.0 * STAT_DT, 200.0 * STAT_DT)
+    times, vals, spans = TelemetryCache._merge(old, *new)
+    np.testing.assert_array_equal(times, np.arange(0.0, 200.0 * STAT_DT, STAT_DT))
+    np.testing.assert_array_equal(spans, [[0.0, 199.0 * STAT_DT]])
+
+
+def test_merge_disjoint():
+    first = _samples(1000.0 * STAT_DT, 1100.0 * STAT_DT)
+    second = _samples(0.0, 100.0 * STAT_DT)
+    third = _samples(500.0 * STAT_DT, 600.0 * STAT_DT)
+    cached = TelemetryCache._merge(None, *first)
+    cached = TelemetryCache._merge(cached, *second)
+    cached = TelemetryCache._merge(cached, *third)
+    times, vals, spans = cached
+    # All of the samples are kept, in time order
+    np.testing.assert_array_equal(
+        times, np.concatenate([second[0], third[0], first[0]])
+    )
+    np.testing.assert_array_equal(vals, np.concatenate([second[1], third[1], first[1]]))
+    np.testing.assert_array_equal(
+        spans,
+        [
+            [0.0, 99.0 * STAT_DT],
+            [500.0 * STAT_DT, 599.0 * STAT_DT],
+            [1000.0 * STAT_DT, 1099.0 * STAT_DT],
+        ],
+    )
+    # Each span covers its own start times, but not the gaps between them
+    assert TelemetryCache._find_span(cached, 10.0 * STAT_DT) == (0.0, 99.0 * STAT_DT)
+    assert TelemetryCache._find_span(cached, 550.0 * STAT_DT) == (
+        500.0 * STAT_DT,
+        599.0 * STAT_DT,
+    )
+    assert TelemetryCache._find_span(cached, 300.0 * STAT_DT) is None
+
+    # Filling in a gap joins the spans on either side of it
+    cached = TelemetryCache._merge(cached, *_samples(100.0 * STAT_DT, 500.0 * STAT_DT))
+    np.testing.assert_array_equal(
+        cached[2], [[0.0, 599.0 * STAT_DT], [1000.0 * STAT_DT, 1099.0 * STAT_DT]]
+    )
+
+
+def test_merge_empty():
+    old = TelemetryCache._merge(None, *_samples(0.0, 100.0 * STAT_DT))
+    assert TelemetryCache._merge(old, np.array([]), np.array([])) is old
+    assert TelemetryCache._merge(None, np.array([]), np.array([])) is None
+
+
+def test_read_write(tmp_path):
+    cache = TelemetryCache(tmp_path)
+    cached = TelemetryCache._merge(None, *_samples(0.0, 100.0 * STAT_DT))
+    cached = TelemetryCache._merge(cached, *_samples(500.0 * STAT_DT, 600.0 * STAT_DT))
+    cache._write("1DPAMZT", "5min", *cached)
+    for a, b in zip(cache._read("1dpamzt", "5min"), cached, strict=True):
+        np.testing.assert_array_equal(a, b)
+    assert cache._read("1deamzt", "5min") is None
+
+
+def _cached_msidset(msidset):
+    return CachedMSIDset(
+        (msid, CachedMSID(msid, x.times.copy(), x.vals.copy()))
+        for msid, x in msidset.items()
+    )
+
+
+def test_interpolate_grid():
+    # The telemetry ends most of a bin after the last whole bin, where
+    # a grid from np.arange(start, stop + 1, dt) gets an extra time
+    times = 1000.0 + np.arange(20) * 300.0
+    msidset = CachedMSIDset(
+        [
+            ("a", CachedMSID("a", times, times * 2.0)),
+            ("b", CachedMSID("b", times[1:], times[1:] * 3.0)),
+        ]
+    )
+    start = times[1]
+    stop = times[-1]
+    msidset.interpolate(STAT_DT, start, stop + 1)
+    n = int((stop - start) // STAT_DT) + 1
+    np.testing.assert_array_equal(msidset.times, start + np.arange(n) * STAT_DT)
+    assert msidset.times[-1] <= stop
+    for msid in msidset.values():
+        assert len(msid.vals) == n
+    # Nearest-neighbor values
+    np.testing.assert_array_equal(msidset["a"].vals[:3], [2600.0, 3200.0, 3800.0])
+
+
+@pytest.mark.parametrize("pad", [(0.0, 1.0), (100.0, -100.0), (-1000.0, 1000.0)])
+def test_interpolate_matches_cheta(pad):
+    from cheta import fetch
+
+    msidset = fetch.MSIDset(
+        ["1dpamzt", "pitch", "sim_z"],
+        "2021:001:00:00:00",
+        "2021:005:00:00:00",
+        stat="5min",
+    )
+    cached = _cached_msidset(msidset)
+    start = max(x.times[0] for x in msidset.values()) + pad[0]
+    stop = min(x.times[-1] for x in msidset.values()) + pad[1]
+    msidset.interpolate(STAT_DT, start, stop)
+    cached.interpolate(STAT_DT, start, stop)
+    np.testing.assert_array_equal(cached.times, msidset.times)
+    for msid in msidset:
+        np.testing.assert_array_equal(cached[msid].vals, msidset[msid].vals)
+
+
+def _model_inputs():
+    model_spec = {"name": "dpa", "pars": [{"full_name": "a", "val": 1.0}]}
+    states = np.rec.fromarrays(
+        [np.array([0.0, 100.0]), np.array([100.0, 200.0]), np.array([1, 2])],
+        names=["tstart", "tstop", "ccd_count"],
+    )
+    state0 = {"1dpamzt": 20.0, "ccd_count": 1}
+    ephem = {"orbitephem0_x": np.arange(3.0), "orbitephem0_y": np.arange(3.0) * 2}
+    return model_spec, states, state0, ephem
+
+
+def test_model_cache_key_stable():
+    model_spec, states, state0, ephem = _model_inputs()
+    key = ModelCache.make_key("dpa", model_spec, states, 0.0, 200.0, state0, ephem)
+    assert len(key) == 64
+    # The key depends only on the contents of the inputs
+    model_spec2, states2, state02, ephem2 = _model_inputs()
+    model_spec2 = dict(reversed(list(model_spec2.items())))
+    state02 = dict(reversed(list(state02.items())))
+    ephem2 = dict(reversed(list(ephem2.items())))
+    assert key == ModelCache.make_key(
+        "dpa", model_spec2, states2, 0.0, 200.0, state02, ephem2
+    )
+    # ...and changes with any of them
+    states2["ccd_count"][1] = 3
+    ephem2["orbitephem0_x"][0] = 0.5
+    state02["1dpamzt"] = 21.0
+    changed = [
+        ("dea", model_spec, states, 0.0, 200.0, state0, ephem),
+        ("dpa", model_spec, states2, 0.0, 200.0, state0, ephem),
+        ("dpa", model_spec, states, 0.0, 100.0, state0, ephem),
+        ("dpa", model_spec, states, 0.0, 200.0, state02, ephem),
+        ("dpa", model_spec, states, 0.0, 200.0, None, ephem),
+        ("dpa", model_spec, states, 0.0, 200.0, state0, ephem2),
+    ]
+    keys = {ModelCache.make_key(*args) for args in changed}
+    keys.add(
+        ModelCache.make_key(
+            "dpa", model_spec, states, 0.0, 200.0, state0, ephem, extra=("1.0",)
+        )
+    )
+    assert key not in keys
+    assert len(keys) == len(changed) + 1
+
+
+def test_model_cache_round_trip(tmp_path):
+    from acis_thermal_check.main import ACISThermalCheck
+
+    mvals = ["1dpamzt"] + ACISThermalCheck._cached_mvals
+    dvals = ACISThermalCheck._cached_dvals
+    times = np.linspace(0.0, 1000.0, 11)
+    comp = {
+        name: types.SimpleNamespace(mvals=times + i, dvals=times - i)
+        for i, name in enumerate(mvals + dvals)
+    }
+    model = types.SimpleNamespace(
+        times=times,
+        comp=comp,
+        bad_times=[["2020:001:00:00:00", "2020:002:00:00:00"]],
+    )
+    cache = ModelCache(tmp_path)
+    assert cache.get("abc", "dpa") is None
+    cache.put("abc", model, mvals, dvals)
+    cached = cache.get("abc", "dpa")
+    assert cached.name == "dpa"
+    np.testing.assert_array_equal(cached.times, times)
+    assert cached.bad_times == model.bad_times
+    for name in mvals:
+        np.testing.assert_array_equal(cached.comp[name].mvals, comp[name].mvals)
+    for name in dvals:
+        np.testing.assert_array_equal(cached.comp[name].dvals, comp[name].dvals)
+    # Only the values which were asked for are kept
+    with pytest.raises(AttributeError):
+        assert cached.comp[mvals[0]].dvals is None
+
+
+def test_model_cache_prune(tmp_path):
+    cache = ModelCache(tmp_path)
+    model = types.SimpleNamespace(times=np.arange(3.0), comp={})
+    cache.put("old", model, [], [])
+    cache.put("new", model, [], [])
+    t_old = time.time() - 31 * 86400.0
+    os.utime(cache._cache_file("old"), (t_old, t_old))
+    cache = ModelCache(tmp_path, max_days=30.0)
+    assert cache.get("old", "dpa") is None
+    assert cache.get("new", "dpa") is not None
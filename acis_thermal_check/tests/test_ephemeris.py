@@ -0,0 +1,122 @@
+import sys
+import types
+
+import cheta
+import numpy as np
+import pytest
+from cxotime import CxoTime
+
+from acis_thermal_check.ephemeris import (
+    EphemerisProvider,
+    EphemerisStore,
+    ephem_msids,
+)
+
+# The fake archive holds the ephemeris from 10 days before the current
+# time to 5 days after it, 300 s apart
+T_NOW = CxoTime().secs
+ARCHIVE_TIMES = np.arange(T_NOW - 10 * 86400.0, T_NOW + 5 * 86400.0, 300.0)
+AMPLITUDE = 1.0e8
+
+
+def _ephem_vals(i, times):
+    return AMPLITUDE * np.sin(2.0 * np.pi * times / (64.0 * 3600.0) + i)
+
+
+class FakeFetch(types.ModuleType):
+    """
+    A stand-in for cheta.fetch_sci, serving the ephemeris from a
+    fixed set of times, which may be given an offset after some time.
+    """
+
+    def __init__(self):
+        super().__init__("cheta.fetch_sci")
+        self.t_offset = np.inf
+        self.offset = 0.0
+
+    def MSIDset(self, msids, start, stop=None):
+        start = CxoTime(start).secs
+        stop = np.inf if stop is None else CxoTime(stop).secs
+        ok = (ARCHIVE_TIMES >= start) & (ARCHIVE_TIMES <= stop)
+        times = ARCHIVE_TIMES[ok]
+        msidset = {}
+        for i, msid in enumerate(msids):
+            vals = _ephem_vals(i, times)
+            vals[times >= self.t_offset] += self.offset
+            msidset[msid] = types.SimpleNamespace(times=times, vals=vals)
+        return msidset
+
+
+@pytest.fixture()
+def fake_fetch(monkeypatch):
+    fetch = FakeFetch()
+    monkeypatch.setitem(sys.modules, "cheta.fetch_sci", fetch)
+    monkeypatch.setattr(cheta, "fetch_sci", fetch, raising=False)
+    return fetch
+
+
+def test_create_and_extend(tmp_path, fake_fetch):
+    start = T_NOW - 5 * 86400.0
+    store = EphemerisStore.update(
+        tmp_path, start=start, stop=T_NOW - 2 * 86400.0, dt=60.0
+    )
+    assert store.tstart == start
+    assert store.n == int(np.floor(3 * 86400.0 / 60.0)) + 1
+    old_data = np.array(store.data)
+
+    # Rows after the end of the store are appended
+    new_store = EphemerisStore.update(tmp_path, stop=T_NOW, refresh=0.0)
+    assert new_store.n == int(np.floor((T_NOW - start) / 60.0)) + 1
+    assert new_store.covers(start, T_NOW - 60.0)
+    assert not new_store.covers(start, T_NOW + 3600.0)
+    np.testing.assert_array_equal(new_store.data[: store.n], old_data)
+    np.testing.assert_array_equal(store.data, old_data)
+    store = new_store
+    old_data = np.array(store.data)
+
+    # Extending the store keeps the rows before the refresh time
+    store = EphemerisStore.update(tmp_path, refresh=86400.0)
+    assert store.t0 == start
+    assert store.tstop > T_NOW + 4 * 86400.0
+    i_refresh = int(np.ceil((T_NOW - 86400.0 - start) / 60.0))
+    np.testing.assert_array_equal(store.data[:i_refresh], old_data[:i_refresh])
+
+    # Updating to a time before the end of the store does not shorten it
+    n = store.n
+    store = EphemerisStore.update(tmp_path, stop=T_NOW, refresh=86400.0)
+    assert store.n == n
+
+
+def test_refresh(tmp_path, fake_fetch):
+    start = T_NOW - 5 * 86400.0
+    store = EphemerisStore.update(tmp_path, start=start, dt=60.0)
+    old_data = np.array(store.data)
+
+    # New predictive ephemeris after the current time
+    fake_fetch.t_offset = T_NOW
+    fake_fetch.offset = 1000.0
+    new_store = EphemerisStore.update(tmp_path, refresh=86400.0)
+    assert new_store.n == store.n
+    grid = start + np.arange(new_store.n) * new_store.dt
+    after = grid > T_NOW + 2000.0
+    before = grid < T_NOW - 2000.0
+    np.testing.assert_allclose(
+        new_store.data[after], old_data[after] + 1000.0, rtol=0, atol=1e-6
+    )
+    np.testing.assert_array_equal(new_store.data[before], old_data[before])
+
+    # A store opened before the refresh still reads the old rows
+    np.testing.assert_array_equal(store.data, old_data)
+
+
+def test_matches_archive(tmp_path, fake_fetch):
+    store = EphemerisStore.update(tmp_path, start=T_NOW - 5 * 86400.0, dt=60.0)
+    times = np.arange(T_NOW - 4 * 86400.0, T_NOW + 2 * 86400.0, 328.0)
+    from_store = EphemerisProvider(store=store).get_ephemeris(
+        times[0], times[-1], times
+    )
+    from_archive = EphemerisProvider().get_ephemeris(times[0], times[-1], times)
+    for msid in ephem_msids:
+        np.testing.assert_allclose(
+            from_store[msid], from_archive[msid], rtol=0, atol=1e-6 * AMPLITUDE
+        )
@@ -0,0 +1,51 @@
+import pytest
+
+from acis_thermal_check.apps.dpa_check import DPACheck
+
+TSTART = 725846469.184  # 2021:001:00:00:00
+
+
+def make_check(days_with_telem):
+    """
+    A DPA check which finds telemetry only if it asks for at least
+    ``days_with_telem`` days of it.
+    """
+    check = DPACheck()
+    check.fast_check = True
+    check.requests = []
+
+    def get_telem_values(tstart, days=14):
+        check.requests.append(days)
+        if days < days_with_telem:
+            raise ValueError(f"Found no telemetry within {days} days of {tstart}")
+        return {"days": days}
+
+    check.get_telem_values = get_telem_values
+    return check
+
+
+def test_fast_check_telem():
+    check = make_check(1.0)
+    assert check._get_run_telem_values(TSTART, 21) == {"days": 3.0}
+    assert check.requests == [3.0]
+
+
+def test_fast_check_telem_gap():
+    # After a comm gap longer than the fast check window, the fast
+    # check gets the same telemetry as a full run
+    check = make_check(10.0)
+    assert check._get_run_telem_values(TSTART, 21) == {"days": 21}
+    assert check.requests == [3.0, 21]
+
+
+def test_fast_check_no_telem():
+    check = make_check(30.0)
+    with pytest.raises(ValueError, match="no telemetry"):
+        check._get_run_telem_values(TSTART, 21)
+
+
+def test_full_run_telem():
+    check = make_check(1.0)
+    check.fast_check = False
+    assert check._get_run_telem_values(TSTART, 21) == {"days": 21}
+    assert check.requests == [21]
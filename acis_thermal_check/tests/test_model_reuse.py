@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+
+import numpy as np
+from astropy.table import Table
+
+from acis_thermal_check.apps.dpa_check import DPACheck
+
+TSTART = 725846469.184  # 2021:001:00:00:00
+TSTOP = TSTART + 2 * 86400.0
+
+
+class FakeEphemerisProvider:
+    """
+    Serves a circular orbit and a fixed sun position instead of
+    the ephemeris from the archive.
+    """
+
+    def get_ephemeris(self, start, stop, times):
+        phase = 2.0 * np.pi * (times - TSTART) / (64.0 * 3600.0)
+        ephem = {
+            "orbitephem0_x": 1.0e8 * np.cos(phase),
+            "orbitephem0_y": 1.0e8 * np.sin(phase),
+            "orbitephem0_z": np.zeros_like(times),
+            "solarephem0_x": np.full_like(times, 1.5e11),
+            "solarephem0_y": np.zeros_like(times),
+            "solarephem0_z": np.zeros_like(times),
+        }
+        return ephem
+
+
+def make_states():
+    n = 4
+    tstart = TSTART + np.arange(n) * (TSTOP - TSTART) / n
+    # Attitudes pitched to different angles about the body y-axis
+    angles = np.radians([45.0, 90.0, 120.0, 160.0]) / 2.0
+    zeros = np.zeros(n)
+    return Table(
+        [
+            tstart,
+            tstart + (TSTOP - TSTART) / n,
+            np.array([75624, -99616, 75624, 92904]),
+            np.array(["DAY"] * n),
+            np.array([6, 4, 0, 5]),
+            np.array([6, 4, 3, 5]),
+            np.array([1, 1, 0, 1]),
+            np.array([1, 1, 0, 1]),
+            zeros,
+            np.sin(angles),
+            zeros,
+            np.cos(angles),
+        ],
+        names=[
+            "tstart",
+            "tstop",
+            "simpos",
+            "eclipse",
+            "ccd_count",
+            "fep_count",
+            "vid_board",
+            "clocking",
+            "q1",
+            "q2",
+            "q3",
+            "q4",
+        ],
+    )
+
+
+def make_check():
+    check = DPACheck()
+    check.ephem_provider = FakeEphemerisProvider()
+    return check
+
+
+def test_copied_model_matches_fresh():
+    model_spec = json.loads(
+        (Path(__file__).parent / "dpa" / "dpa_test_spec.json").read_text()
+    )
+    states = make_states()
+
+    # The first model run keeps a template, which the second is copied from
+    check = make_check()
+    first = check.calc_model(
+        model_spec, states, TSTART, TSTOP, state0={"1dpamzt": 20.0}, reuse=True
+    )
+    first_mvals = first.comp["1dpamzt"].mvals.copy()
+    copied = check.calc_model(
+        model_spec, states, TSTART, TSTOP, state0={"1dpamzt": 30.0}
+    )
+    assert copied is not first
+
+    fresh = make_check().calc_model(
+        model_spec, states, TSTART, TSTOP, state0={"1dpamzt": 30.0}
+    )
+    np.testing.assert_array_equal(copied.times, fresh.times)
+    names = [comp.name for comp in fresh.comps if getattr(comp, "predict", False)]
+    for name in names + ["pitch", "roll", "sim_z"]:
+        np.testing.assert_array_equal(copied.comp[name].mvals, fresh.comp[name].mvals)
+
+    # Running the copy does not change the first model
+    np.testing.assert_array_equal(first.comp["1dpamzt"].mvals, first_mvals)
+    assert not np.allclose(first_mvals, fresh.comp["1dpamzt"].mvals)
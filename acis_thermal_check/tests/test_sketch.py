@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from acis_thermal_check.sketch import ResidualSketch
+from acis_thermal_check.utils import calc_quantiles
+
+quantiles = (1, 5, 16, 50, 84, 95, 99)
+
+
+def test_merged_quantiles():
+    resolution = 0.01
+    rng = np.random.default_rng(0)
+    values = rng.normal(scale=2.0, size=20000)
+
+    # Sketches of the chunks of the values, merged together
+    merged = ResidualSketch(resolution)
+    for chunk in np.array_split(values, 7):
+        sketch = ResidualSketch(resolution)
+        sketch.update(chunk)
+        merged.merge(sketch)
+    whole = ResidualSketch(resolution)
+    whole.update(values)
+    assert merged.count == values.size
+    assert merged.offset == whole.offset
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    assert (merged.vmin, merged.vmax) == (values.min(), values.max())
+
+    expected = calc_quantiles(values, quantiles)
+    for quant, value in merged.quantiles(quantiles).items():
+        assert abs(value - expected[quant]) <= 0.5 * resolution * (1.0 + 1.0e-9)
+
+
+def test_update_ignores_nonfinite():
+    sketch = ResidualSketch(0.1)
+    sketch.update([1.0, np.nan, -np.inf, 2.0])
+    assert sketch.count == 2
+    assert (sketch.vmin, sketch.vmax) == (1.0, 2.0)
+
+
+def test_max_bins():
+    resolution = 0.1
+    max_bins = 100
+    sketch = ResidualSketch(resolution, max_bins=max_bins)
+    rng = np.random.default_rng(1)
+    values = rng.uniform(-1.0, 1.0, size=1000)
+    sketch.update(values)
+    # Wild values are counted in the outermost bins, but still set the
+    # range of the residuals
+    sketch.update([-1.0e6, 1.0e6])
+    assert sketch.counts.size <= max_bins
+    assert sketch.offset == -max_bins // 2
+    assert sketch.counts[0] == 1
+    assert sketch.counts[-1] == 1
+    assert sketch.count == values.size + 2
+    assert (sketch.vmin, sketch.vmax) == (-1.0e6, 1.0e6)
+    # The quantiles away from the wild values are unaffected
+    expected = calc_quantiles(np.concatenate([values, [-1.0e6, 1.0e6]]), quantiles)
+    for quant in (16, 50, 84):
+        value = sketch.quantiles([quant])[quant]
+        assert abs(value - expected[quant]) <= 0.5 * resolution * (1.0 + 1.0e-9)
+    counts, edges = sketch.histogram(bins=50)
+    assert counts.sum() == sketch.count
+    assert (edges[0], edges[-1]) == (-1.0e6, 1.0e6)
+
+
+def test_merge_different_resolutions():
+    sketch = ResidualSketch(0.1)
+    with pytest.raises(ValueError, match="resolutions"):
+        sketch.merge(ResidualSketch(0.2))
+
+
+def test_empty_quantiles():
+    with pytest.raises(ValueError, match="empty"):
+        ResidualSketch(0.1).quantiles(quantiles)
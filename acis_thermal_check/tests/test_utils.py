@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from acis_thermal_check.utils import StateSampler, calc_quantiles, decimate_minmax
+
+
+def make_states():
+    tstart = np.array([0.0, 100.0, 250.0])
+    return np.rec.fromarrays(
+        [tstart, np.array([100.0, 250.0, 400.0]), np.array([1, 2, 3])],
+        names=["tstart", "tstop", "ccd_count"],
+    )
+
+
+def test_state_sampler():
+    states = make_states()
+    times = np.array([0.0, 50.0, 100.0, 150.0, 300.0, 400.0])
+    sampler = StateSampler(states, times)
+    np.testing.assert_array_equal(
+        sampler.sample(states["ccd_count"]), [1, 1, 1, 2, 3, 3]
+    )
+
+
+def test_state_sampler_set_data():
+    class Comp:
+        def set_data(self, *args):
+            self.args = args
+
+    states = make_states()
+    sampler = StateSampler(states, np.array([0.0, 150.0, 300.0]))
+    comp = Comp()
+    sampler.set_data(comp, states["ccd_count"])
+    # The sampled values are set without times, so xija does not
+    # interpolate them again
+    assert len(comp.args) == 1
+    np.testing.assert_array_equal(comp.args[0], [1, 2, 3])
+
+
+@pytest.mark.parametrize("times", [[-10.0, 50.0], [50.0, 410.0]])
+def test_state_sampler_outside_states(times):
+    with pytest.raises(ValueError, match="do not cover"):
+        StateSampler(make_states(), np.array(times))
+
+
+@pytest.mark.parametrize("n", [1, 7, 100, 5500])
+def test_calc_quantiles(n):
+    quantiles = (1, 5, 16, 50, 84, 95, 99)
+    rng = np.random.default_rng(n)
+    values = rng.normal(size=(3, n))
+    quants = calc_quantiles(values, quantiles)
+    for row, vals in enumerate(values):
+        # The quantiles have always been found by indexing sorted values
+        diff = np.sort(vals)
+        row_quants = calc_quantiles(vals, quantiles)
+        for quant in quantiles:
+            assert quants[quant][row] == diff[(len(diff) * quant) // 100]
+            assert row_quants[quant] == diff[(len(diff) * quant) // 100]
+
+
+def test_decimate_minmax():
+    rng = np.random.default_rng(0)
+    x = np.sort(rng.uniform(0.0, 1.0e6, size=100000))
+    y = np.cumsum(rng.normal(size=x.size))
+    num_bins = 500
+    xd, yd = decimate_minmax(x, y, num_bins)
+    assert len(xd) <= 4 * num_bins
+    # The decimated series is a subset of the series, in order, with
+    # the same ends
+    idxs = np.searchsorted(x, xd)
+    np.testing.assert_array_equal(x[idxs], xd)
+    np.testing.assert_array_equal(y[idxs], yd)
+    assert np.all(np.diff(idxs) > 0)
+    assert (idxs[0], idxs[-1]) == (0, x.size - 1)
+    # The extrema of the series, and of each bin, are kept
+    assert (yd.min(), yd.max()) == (y.min(), y.max())
+    edges = np.linspace(x[0], x[-1], num_bins + 1)
+    for lo, hi in zip(edges[:-1], edges[1:], strict=True):
+        in_bin = (x >= lo) & (x < hi)
+        if in_bin.any():
+            in_dbin = (xd >= lo) & (xd < hi)
+            assert yd[in_dbin].min() == y[in_bin].min()
+            assert yd[in_dbin].max() == y[in_bin].max()
+
+
+def test_decimate_minmax_short():
+    x = np.arange(40.0)
+    y = np.sin(x)
+    xd, yd = decimate_minmax(x, y, 10)
+    assert xd is x
+    assert yd is y
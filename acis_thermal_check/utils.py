@@ -1,9 +1,11 @@
 import logging
 from pathlib import Path, PurePath
 
-import matplotlib.pyplot as plt
 import numpy as np
 import ska_numpy
+from cxotime import CxoTime
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
 from ska_matplotlib import cxctime2plotdate, set_time_ticks
 
 TASK_DATA = Path(PurePath(__file__).parent / "..").resolve()
@@ -14,7 +16,102 @@ thermal_blue = "blue"
 thermal_red = "red"
 
 
-def calc_pitch_roll(times, ephem, states):
+class StateSampler:
+    """
+    Samples the values of the commanded states onto the times of a
+    model. The index of the state which covers each model time is
+    found once, and is then used for every state value which is set
+    on the model.
+
+    Parameters
+    ----------
+    states : NumPy record array
+        Commanded states
+    times : NumPy array
+        The times of the model in seconds
+    """
+
+    def __init__(self, states, times):
+        self.times = times
+        self.idxs = np.searchsorted(states["tstop"], times)
+        # The states must cover all of the model times, rather than
+        # being stretched to cover them
+        if np.any(self.idxs >= len(states)) or np.any(times < states["tstart"][0]):
+            raise ValueError(
+                "The commanded states between "
+                f"{CxoTime(states['tstart'][0]).date} and "
+                f"{CxoTime(states['tstop'][-1]).date} do not cover the "
+                f"model times between {CxoTime(times[0]).date} and "
+                f"{CxoTime(times[-1]).date}!"
+            )
+        # The attitude has always been taken from the state whose start
+        # is nearest to each time, so it keeps its own index
+        self.attitude_idxs = ska_numpy.interpolate(
+            np.arange(len(states)),
+            states["tstart"],
+            times,
+            method="nearest",
+        )
+
+    def sample(self, values):
+        """
+        Sample the values of a state column onto the model times.
+
+        Parameters
+        ----------
+        values : array-like
+            One value per commanded state.
+        """
+        return np.asarray(values)[self.idxs]
+
+    def set_data(self, comp, values):
+        """
+        Set the data of a model component from the values of a state
+        column. The values are already sampled onto the model times,
+        so they are set without times, and xija uses them as they are
+        rather than interpolating them again.
+
+        Parameters
+        ----------
+        comp : xija component
+            The component of the model to set the data of.
+        values : array-like
+            One value per commanded state.
+        """
+        comp.set_data(self.sample(values))
+
+
+def calc_body_rotations(states):
+    """
+    Calculate the attitude matrix of each commanded state from its
+    quaternion. The columns of each matrix are the body axes in ECI
+    coordinates.
+
+    Parameters
+    ----------
+    states : array-like
+        commanded states NumPy recarray
+
+    Returns
+    -------
+    A NumPy array of shape (len(states), 3, 3)
+    """
+    q = np.array([states["q1"], states["q2"], states["q3"], states["q4"]])
+    x, y, z, w = q / np.sqrt((q**2).sum(axis=0))
+    rot = np.empty((q.shape[1], 3, 3))
+    rot[:, 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    rot[:, 0, 1] = 2.0 * (x * y - z * w)
+    rot[:, 0, 2] = 2.0 * (x * z + y * w)
+    rot[:, 1, 0] = 2.0 * (x * y + z * w)
+    rot[:, 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    rot[:, 1, 2] = 2.0 * (y * z - x * w)
+    rot[:, 2, 0] = 2.0 * (x * z - y * w)
+    rot[:, 2, 1] = 2.0 * (y * z + x * w)
+    rot[:, 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+    return rot
+
+
+def calc_pitch_roll(times, ephem, states, sampler=None):
     """
     Calculate the normalized sun vector in body coordinates.
     Shamelessly copied from cheta.derived.pcad but
@@ -28,20 +125,18 @@ def calc_pitch_roll(times, ephem, states):
         orbitephem and solarephem info
     states : array-like
         commanded states NumPy recarray
+    sampler : :class:`StateSampler`, optional
+        The sampler of the states onto *times*. Default: None, which
+        means one is made here.
 
     Returns
     -------
     3 NumPy arrays: time, pitch and roll
     """
-    from cheta.derived.pcad import arccos_clip, qrotate
-
-    idxs = ska_numpy.interpolate(
-        np.arange(len(states)),
-        states["tstart"],
-        times,
-        method="nearest",
-    )
-    states = states[idxs]
+    # The quaternions are constant within each state, so only the
+    # state index of each time is needed, not a copy of the states
+    if sampler is None:
+        sampler = StateSampler(states, times)
 
     chandra_eci = np.array(
         [ephem["orbitephem0_x"], ephem["orbitephem0_y"], ephem["orbitephem0_z"]],
@@ -50,19 +145,85 @@ def calc_pitch_roll(times, ephem, states):
         [ephem["solarephem0_x"], ephem["solarephem0_y"], ephem["solarephem0_z"]],
     )
     sun_vec = -chandra_eci + sun_eci
-    est_quat = np.array([states["q1"], states["q2"], states["q3"], states["q4"]])
-
-    sun_vec_b = qrotate(est_quat, sun_vec)  # Rotate into body frame
-    magnitude = np.sqrt((sun_vec_b**2).sum(axis=0))
+    magnitude = np.sqrt((sun_vec**2).sum(axis=0))
     magnitude[magnitude == 0.0] = 1.0
-    sun_vec_b = sun_vec_b / magnitude  # Normalize
+    sun_vec = sun_vec / magnitude  # Normalize
+
+    # Rotate into the body frame with the transposes of the attitude
+    # matrices, which are computed once per state
+    rot = calc_body_rotations(states)
+    sun_vec_b = np.einsum("nji,jn->in", rot[sampler.attitude_idxs], sun_vec)
 
-    pitch = np.degrees(arccos_clip(sun_vec_b[0, :]))
+    pitch = np.degrees(np.arccos(np.clip(sun_vec_b[0, :], -1.0, 1.0)))
     roll = np.degrees(np.arctan2(-sun_vec_b[1, :], -sun_vec_b[2, :]))
 
     return pitch, roll
 
 
+def calc_quantiles(values, quantiles):
+    """
+    Calculate quantiles of a set of values along their last axis. The
+    q-th quantile is the value at index ``(n * q) // 100`` of the sorted
+    values.
+
+    Parameters
+    ----------
+    values : NumPy array
+        The values, which may be 2-D with one set of values per row.
+    quantiles : list of integers
+        The quantiles to calculate, in percent.
+
+    Returns
+    -------
+    A dictionary of the quantiles, keyed by the values of *quantiles*.
+    """
+    n = values.shape[-1]
+    # For the sizes of the validation residuals, one sort is faster than
+    # selecting each of the quantiles
+    values = np.sort(values, axis=-1)
+    return {quant: values[..., (n * quant) // 100] for quant in quantiles}
+
+
+def decimate_minmax(x, y, num_bins):
+    """
+    Decimate a time series before it is plotted, by splitting its
+    times into *num_bins* equal bins (e.g. one per pixel column of the
+    plot) and keeping only the first, last, smallest, and largest value
+    in each bin. The line drawn through the decimated series looks the
+    same as that through the full series, and its extrema are kept.
+
+    Parameters
+    ----------
+    x : NumPy array
+        The times, in increasing order.
+    y : NumPy array
+        The values at the times.
+    num_bins : integer
+        The number of bins.
+
+    Returns
+    -------
+    The times and values which are kept. If the series has no more
+    than four values per bin, it is returned unchanged.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(x) <= 4 * num_bins:
+        return x, y
+    edges = np.linspace(x[0], x[-1], num_bins + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1]))
+    stops = np.append(starts[1:], len(x))
+    bins = np.repeat(np.arange(len(starts)), stops - starts)
+    keep = [starts, stops - 1]
+    for reduce in (np.minimum, np.maximum):
+        # The first index in each bin where the value is the extremum
+        hits = np.flatnonzero(y == reduce.reduceat(y, starts)[bins])
+        _, first = np.unique(bins[hits], return_index=True)
+        keep.append(hits[first])
+    keep = np.unique(np.concatenate(keep))
+    return x[keep], y[keep]
+
+
 def config_logging(outdir, verbose):
     """
     Set up file and console logger.
@@ -92,6 +253,13 @@ def config_logging(outdir, verbose):
     logger = logging.getLogger("acis_thermal_check")
     logger.setLevel(logging.DEBUG)
 
+    # Remove the handlers from any previous model run in this
+    # process, so that messages are not repeated or written to
+    # the log file of the previous run
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+
     # Set numerical values for the different log levels
     loglevel = {0: logging.CRITICAL, 1: logging.INFO, 2: logging.DEBUG}.get(
         verbose,
@@ -127,8 +295,6 @@ class PlotDate:
 
     Parameters
     ----------
-    fig_id : integer
-        The ID for this particular figure.
     x : NumPy array
         Times in seconds since the beginning of the mission for
         the left y-axis quantity.
@@ -168,7 +334,6 @@ class PlotDate:
 
     def __init__(
         self,
-        fig_id,
         x,
         y,
         x2=None,
@@ -190,13 +355,25 @@ class PlotDate:
     ):
         # Convert times to dates
         xt = cxctime2plotdate(x)
-        fig = plt.figure(fig_id, figsize=figsize)
-        fig.clf()
+        fig = Figure(figsize=figsize)
+        # The lines are decimated to a few points per pixel column
+        num_bins = int(fig.get_size_inches()[0] * fig.dpi)
         ax = fig.add_subplot(1, 1, 1)
         # Plot left y-axis
-        ax.plot(xt, y, linestyle="-", linewidth=linewidth, color=self._color, zorder=10)
+        ax.plot(
+            *decimate_minmax(xt, y, num_bins),
+            linestyle="-",
+            linewidth=linewidth,
+            color=self._color,
+            zorder=10,
+        )
         if yy is not None:
-            ax.plot(xt, yy, linestyle="--", linewidth=linewidth, color=self._color2)
+            ax.plot(
+                *decimate_minmax(xt, yy, num_bins),
+                linestyle="--",
+                linewidth=linewidth,
+                color=self._color2,
+            )
         if xmin is None:
             xmin = min(xt)
         if xmax is None:
@@ -216,7 +393,12 @@ class PlotDate:
         if x2 is not None and y2 is not None:
             ax2 = ax.twinx()
             xt2 = cxctime2plotdate(x2)
-            ax2.plot(xt2, y2, linestyle="-", linewidth=linewidth2, color="magenta")
+            ax2.plot(
+                *decimate_minmax(xt2, y2, num_bins),
+                linestyle="-",
+                linewidth=linewidth2,
+                color="magenta",
+            )
             ax2.set_xlim(xmin, xmax)
             if ylim2:
                 ax2.set_ylim(*ylim2)
@@ -388,6 +570,104 @@ def get_options(opts=None, use_acis_opts=True):
             help="Full path to the Non-Load Event Tracking file that should be "
             "used for this model run.",
         )
+    parser.add_argument(
+        "--chandra-models-version",
+        help="The version of chandra_models to get the model specification "
+        "from, if --model-spec is not given. If --cache-dir is also given, the "
+        "model specification for this version is kept in the cache directory "
+        "and the chandra_models repository is not needed for later runs. "
+        "Default: None, which means the latest version.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for a local cache of telemetry which is reused "
+        "between runs, so that only new telemetry is fetched from the "
+        "archive. Default: None, which means no cache is used.",
+    )
+    parser.add_argument(
+        "--ephem-store",
+        help="Directory of a precomputed ephemeris store, made with "
+        "update_ephem_store, to interpolate the ephemeris from. Times which "
+        "it does not cover are fetched from the archive. Default: None",
+    )
+    parser.add_argument(
+        "--model-cache",
+        action="store_true",
+        help="Keep the results of the model runs in the cache directory given "
+        "by --cache-dir, and reuse them when a model is run again with exactly "
+        "the same inputs. Default: False",
+    )
+    parser.add_argument(
+        "--warm-start",
+        action="store_true",
+        help="Keep a history of the validation model runs with daily "
+        "checkpoints of the node temperatures in the cache directory given "
+        "by --cache-dir, and resume the validation from the latest "
+        "checkpoint. Default: False",
+    )
+    parser.add_argument(
+        "--ensemble",
+        type=int,
+        default=0,
+        help="Number of prediction models to run with initial temperatures "
+        "spread around that of the prediction, whose envelope is shown on "
+        "the temperature plot. Default: 0, which means no ensemble is run.",
+    )
+    parser.add_argument(
+        "--ensemble-spread",
+        type=float,
+        default=1.0,
+        help="The largest offset of the initial temperatures of the ensemble "
+        "from that of the prediction (degC). Default: 1.0",
+    )
+    parser.add_argument(
+        "--ensemble-nodes",
+        action="store_true",
+        help="Also perturb the initial temperatures of the pseudo-nodes of "
+        "the ensemble models by up to the ensemble spread. Default: False",
+    )
+    parser.add_argument(
+        "--limit-scan",
+        type=float,
+        nargs="+",
+        help="Offsets (degC) of the planning limits for which the violations "
+        "of the prediction are checked, without running the model again. The "
+        "upper planning limits are raised and the lower ones lowered by each "
+        "offset. Default: None, which means no limit scan is made.",
+    )
+    parser.add_argument(
+        "--fast-check",
+        action="store_true",
+        help="Only run the prediction and check it for violations of the "
+        "planning limits, without any plots or web page. A summary is printed "
+        "as JSON, and the exit status is 2 if there are violations. "
+        "Default: False",
+    )
+    parser.add_argument(
+        "--products-only",
+        "--no-plots",
+        action="store_true",
+        help="Only write the data files and the violations (to "
+        "violations.json), without any plots or web page. Default: False",
+    )
+    parser.add_argument(
+        "--plot-workers",
+        type=int,
+        default=1,
+        help="Number of processes to render the plots in at the same time. Default: 1",
+    )
+    parser.add_argument(
+        "--concurrent-inputs",
+        action="store_true",
+        help="Gather the telemetry, commanded states, ephemeris, and "
+        "radiation zones concurrently. Default: False",
+    )
+    parser.add_argument(
+        "--parallel-branches",
+        action="store_true",
+        help="Run the model validation in a separate process at the same "
+        "time as the prediction. Default: False",
+    )
     parser.add_argument("--version", action="store_true", help="Print version")
 
     if opts is not None:
@@ -473,9 +753,139 @@ def paint_perigee(perigee_passages, plots):
     plots : dict of plots
         the plots to add the lines to
     """
-    for plot in plots.values():
-        for key in ["entry", "perigee", "exit"]:
-            color = "black" if key == "perigee" else "red"
-            for time in perigee_passages[key]:
-                xpos = cxctime2plotdate([time])[0]
-                plot.ax.axvline(xpos, linestyle=":", color=color, linewidth=2.0)
+    # The lines of each color are drawn as a single collection
+    xpos = {"red": [], "black": []}
+    for key in ["entry", "perigee", "exit"]:
+        color = "black" if key == "perigee" else "red"
+        for time in perigee_passages[key]:
+            xpos[color].append(cxctime2plotdate([time])[0])
+    # Plots which share their axes are only painted once
+    axes = {id(plot.ax): plot.ax for plot in plots.values()}
+    for ax in axes.values():
+        for color, color_xpos in xpos.items():
+            add_vertical_lines(
+                ax,
+                color_xpos,
+                linestyle=":",
+                color=color,
+                linewidth=2.0,
+            )
+
+
+def add_vertical_lines(ax, xpos, **kwargs):
+    """
+    Draw vertical lines across the full height of a plot, like
+    ``ax.axvline``, but as a single collection for all of the lines.
+
+    Parameters
+    ----------
+    ax : Axes
+        The axes to draw the lines on.
+    xpos : list of floats
+        The x positions of the lines.
+    **kwargs
+        The properties of the lines, which are passed to the
+        :class:`~matplotlib.collections.LineCollection`.
+    """
+    if len(xpos) == 0:
+        return
+    lines = LineCollection(
+        [[(x, 0.0), (x, 1.0)] for x in xpos],
+        transform=ax.get_xaxis_transform(),
+        **kwargs,
+    )
+    ax.add_collection(lines, autolim=False)
+
+
+class ForkedTask:
+    """
+    Run a function in a forked child process, which inherits the full
+    state of the parent (the model objects, telemetry, figures, etc.),
+    while the parent carries on with other work. The value returned by
+    the function is sent back to the parent, so it must be picklable.
+
+    Parameters
+    ----------
+    func : callable
+        The function to run in the child process.
+    *args, **kwargs
+        The arguments to call *func* with.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        import multiprocessing
+
+        ctx = multiprocessing.get_context("fork")
+        self._conn, child_conn = ctx.Pipe(duplex=False)
+        self._process = ctx.Process(
+            target=self._run,
+            args=(child_conn, func, args, kwargs),
+        )
+        self._process.start()
+        child_conn.close()
+
+    @staticmethod
+    def _run(conn, func, args, kwargs):
+        import traceback
+
+        try:
+            result = (True, func(*args, **kwargs))
+        except Exception:
+            result = (False, traceback.format_exc())
+        conn.send(result)
+        conn.close()
+
+    def result(self):
+        """
+        Wait for the child process to finish and return the value
+        returned by the function. If the function raised an exception,
+        a RuntimeError with its traceback is raised.
+        """
+        try:
+            ok, value = self._conn.recv()
+        except EOFError:
+            ok, value = False, "The child process exited without a result."
+        self._conn.close()
+        self._process.join()
+        if not ok:
+            raise RuntimeError(f"Forked task failed:\n{value}")
+        return value
+
+    def cancel(self):
+        """
+        Stop the child process without waiting for its result.
+        """
+        self._process.terminate()
+        self._process.join()
+        self._conn.close()
+
+
+def _write_figures(figures):
+    for fig, outfile in figures:
+        mylog.debug("Writing plot file %s" % outfile)
+        fig.savefig(outfile)
+
+
+def save_figures(figures, workers=1):
+    """
+    Write figures to files. With more than one worker, the figures are
+    split between forked processes, which inherit the figures from the
+    parent and render them at the same time.
+
+    Parameters
+    ----------
+    figures : list of (Figure, Path) tuples
+        The figures and the files to write them to. A file which is
+        given more than once is only written once.
+    workers : integer, optional
+        The number of processes to render the figures in. Default: 1,
+        which means they are rendered one after the other in this process.
+    """
+    figures = list({outfile: (fig, outfile) for fig, outfile in figures}.values())
+    workers = min(workers, len(figures))
+    if workers <= 1:
+        _write_figures(figures)
+        return
+    tasks = [ForkedTask(_write_figures, figures[i::workers]) for i in range(workers)]
+    for task in tasks:
+        task.result()
@@ -22,6 +22,10 @@ entry_points = {
         "bep_pcb_check = acis_thermal_check.apps.bep_pcb_check:main",
         "cea_check = acis_thermal_check.apps.cea_check:main",
         "copy_model_outputs = acis_thermal_check.apps.copy_model_outputs:main",
+        "run_all_checks = acis_thermal_check.apps.run_all_checks:main",
+        "update_ephem_store = acis_thermal_check.apps.update_ephem_store:main",
+        "compare_loads = acis_thermal_check.apps.compare_loads:main",
+        "validation_study = acis_thermal_check.apps.validation_study:main",
     ],
 }
 